@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from django.db import transaction, connection
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from account.models import Profile
+from .models import PostSell, PostSellLikes, PostSellDeletes, PostSellReceivedInterest
+from .hidden_posts import invalidate_hidden_posts
+from .tasks import schedule_interest_notifications
+from .response_cache import bump_generation
+
+# Batched likes, hides and interests, for clients that queue actions offline and replay them later.
+# Operations are applied as set/unset of a (kind, post) flag: when a batch touches the same flag
+# several times only the last operation counts, and setting a flag that is already set (or unsetting
+# one that is not) is a no-op instead of an IntegrityError. Each kind costs one read of the current
+# state, one bulk insert with ignore_conflicts and one delete (plus one recount UPDATE for likes),
+# whatever the number of operations.
+
+MAX_ACTIONS = 500
+
+# op -> (kind, set or unset)
+OPERATIONS = {
+    'like': ('like', True),
+    'unlike': ('like', False),
+    'hide': ('hide', True),
+    'unhide': ('hide', False),
+    'interest': ('interest', True),
+    'uninterest': ('interest', False),
+}
+
+# Outcomes reported per operation
+APPLIED = 'applied'  # The flag changed
+UNCHANGED = 'unchanged'  # The flag already had that value
+SUPERSEDED = 'superseded'  # A later operation of the batch on the same flag won
+INVALID = 'invalid'  # Unknown op, unknown post, or no profile for an interest
+
+
+def _flags(kind, user_id, buyer):
+    # (model, lookup of the user's rows, factory of a new row) of one kind
+    if kind == 'like':
+        return PostSellLikes, {'user': user_id}, lambda post_id: PostSellLikes(post_id=post_id, user_id=user_id)
+    if kind == 'hide':
+        return PostSellDeletes, {'user': user_id}, lambda post_id: PostSellDeletes(post_id=post_id, user_id=user_id)
+    return PostSellReceivedInterest, {'buyer': buyer}, lambda post_id: PostSellReceivedInterest(item_id=post_id, buyer=buyer)
+
+
+def _post_field(model):
+    return 'item' if model is PostSellReceivedInterest else 'post'
+
+
+def _delete_flags(model, owner, field, post_ids):
+    # One plain DELETE statement: QuerySet.delete() would load the rows and send post_delete per row.
+    # These tables have no dependent rows, so there is nothing to cascade.
+    (owner_field, owner_value), = owner.items()
+    quote = connection.ops.quote_name
+    sql = 'DELETE FROM %s WHERE %s = %%s AND %s IN (%s)' % (
+        quote(model._meta.db_table), quote(model._meta.get_field(owner_field).column),
+        quote(model._meta.get_field(field).column), ', '.join(['%s'] * len(post_ids)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [getattr(owner_value, 'pk', owner_value), *post_ids])
+
+
+def recount_likes(post_ids):
+    """
+    Set like_count of the given posts from their like rows, in one UPDATE.
+    """
+    counts = PostSellLikes.objects.filter(post=OuterRef('pk')).values('post').annotate(total=Count('id')).values('total')
+    PostSell.objects.filter(id__in=post_ids).update(like_count=Coalesce(Subquery(counts), 0))
+
+
+def apply_actions(user_id, operations):
+    """
+    Apply a list of {'op': ..., 'post': id} for the account user_id in one transaction.
+    Returns one {'op', 'post', 'outcome'} per operation, in the same order.
+    Inserts and deletes skip the model signals; like counts and the hidden cache are updated here
+    once per kind instead of once per row.
+    """
+    outcomes = [None] * len(operations)
+    latest = OrderedDict()  # (kind, post id) -> index of the operation that wins
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        try:
+            post_id = int(operation.get('post'))
+        except (AttributeError, TypeError, ValueError):
+            post_id = None
+        if op not in OPERATIONS or post_id is None:
+            outcomes[index] = INVALID
+            continue
+        key = (OPERATIONS[op][0], post_id)
+        if key in latest:
+            outcomes[latest[key]] = SUPERSEDED
+        latest[key] = index
+
+    post_ids = {post_id for _, post_id in latest}
+    existing_posts = set(PostSell.objects.filter(id__in=post_ids).values_list('id', flat=True))
+    buyer = None
+    if any(kind == 'interest' for kind, _ in latest):
+        buyer = Profile.objects.filter(user=user_id).first()
+
+    with transaction.atomic():
+        for kind in ('like', 'hide', 'interest'):
+            wanted = {post_id: OPERATIONS[operations[index]['op']][1]
+                      for (flag_kind, post_id), index in latest.items() if flag_kind == kind}
+            for post_id in list(wanted):
+                if post_id not in existing_posts or (kind == 'interest' and buyer is None):
+                    outcomes[latest[(kind, post_id)]] = INVALID
+                    del wanted[post_id]
+            if not wanted:
+                continue
+
+            model, owner, new_row = _flags(kind, user_id, buyer)
+            field = _post_field(model)
+            current = set(model.objects.filter(**owner, **{field + '__in': list(wanted)}).values_list(field, flat=True))
+            to_set = [post_id for post_id, value in wanted.items() if value and post_id not in current]
+            to_unset = [post_id for post_id, value in wanted.items() if not value and post_id in current]
+            if to_set:
+                model.objects.bulk_create([new_row(post_id) for post_id in to_set], ignore_conflicts=True)
+            if to_unset:
+                _delete_flags(model, owner, field, to_unset)
+
+            changed = set(to_set) | set(to_unset)
+            for post_id in wanted:
+                outcomes[latest[(kind, post_id)]] = APPLIED if post_id in changed else UNCHANGED
+
+            # Neither write sent signals: do what the post_save/post_delete handlers would have done
+            if kind == 'like' and changed:
+                recount_likes(changed)
+                transaction.on_commit(bump_generation)  # Cached searches carry like_count
+            if kind == 'hide' and changed:
+                transaction.on_commit(lambda: invalidate_hidden_posts(user_id))
+            if kind == 'interest' and to_set:
+                schedule_interest_notifications((buyer.pk, post_id) for post_id in to_set)
+
+    return [
+        {'op': operation.get('op') if isinstance(operation, dict) else None,
+         'post': operation.get('post') if isinstance(operation, dict) else None,
+         'outcome': outcome}
+        for operation, outcome in zip(operations, outcomes)
+    ]
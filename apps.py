@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class PostConfig(AppConfig):
+    """
+    App config for the posts app. Connects the model signal handlers on startup.
+    """
+    name = __name__.rpartition('.')[0]  # The package this app lives in
+
+    def ready(self):
+        from . import signals  # noqa: F401
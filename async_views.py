@@ -0,0 +1,188 @@
+import asyncio
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import F, Window, Count, Max, Exists, OuterRef
+from django.db.models.functions import RowNumber
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import View
+from django.contrib.humanize.templatetags.humanize import naturaltime
+from rest_framework.response import Response
+from .models import PostSell, PostSellPictures, PostSellLikes, PostSellDeletes, PostSellReceivedInterest
+from .serializers import (
+    PostSerializerForGet, PostPicturesSerializerForViewing, InterestedBuyerSerializer, SellerInboxSerializer
+)
+from .pagination import paginate_keyset
+from . import views
+
+# Async versions of two read views whose independent lookups can run at the same time: the batch
+# post detail (PostsSellBatchDetailView) and the seller interest inbox (SellerInterestInboxView).
+# The other views stay sync.
+# Under ASGI a sync view holds the worker's single sync thread for its whole duration; these views
+# wait on the database without blocking the event loop and run independent queries side by side,
+# each in a worker thread with its own connection. They accept and answer exactly like their sync
+# counterparts (same authentication, permissions, params and JSON).
+# Running queries side by side only pays off when the database answers over the network (Postgres).
+# On SQLite, where a query is a local, mostly CPU-bound call, they are no faster than the sync views:
+# run_async_load_test measured x0.96 and x0.97 there.
+# Queries run in worker threads are not seen by ViewMetricsMiddleware or query_budget, and cannot
+# see data of an uncommitted transaction (use TransactionTestCase, not TestCase, to test them).
+
+
+def _own_connection(call):
+    def run():
+        try:
+            return call()
+        finally:
+            close_old_connections()  # Worker threads outlive the request; honour CONN_MAX_AGE like request_finished
+    return run
+
+
+async def gather_queries(*calls):
+    """
+    Run blocking ORM calls (zero-argument callables) at the same time and return their results in order.
+    """
+    return await asyncio.gather(*(sync_to_async(_own_connection(call), thread_sensitive=False)() for call in calls))
+
+
+class AsyncReadView(View):
+    """
+    Base of the async read views. Authentication, permissions, throttling and rendering are done by the
+    DRF view in api_view_class, so the async view behaves like the sync one it mirrors.
+    """
+    api_view_class = None
+
+    def _check_access(self, request, *args, **kwargs):
+        api_view = self.api_view_class()
+        api_view.args, api_view.kwargs = args, kwargs
+        api_view.request = api_view.initialize_request(request, *args, **kwargs)
+        api_view.headers = api_view.default_response_headers
+        try:
+            api_view.initial(api_view.request, *args, **kwargs)
+        except Exception as exc:
+            return api_view, self._render(api_view, api_view.handle_exception(exc))
+        return api_view, None
+
+    def _render(self, api_view, response):
+        response = api_view.finalize_response(api_view.request, response)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def dispatch(self, request, *args, **kwargs):
+        api_view, denied = await sync_to_async(self._check_access)(request, *args, **kwargs)
+        if denied is not None:
+            return denied
+        response = await super().dispatch(request, *args, **kwargs)
+        return self._render(api_view, response)
+
+
+def _viewer_flags(post_ids, user_id):
+    # {post id: row with liked, hidden, interested}, in one query as in PostViewerStateView
+    if not user_id:
+        return {}
+    rows = PostSell.objects.filter(id__in=post_ids).annotate(
+        liked=Exists(PostSellLikes.objects.filter(post=OuterRef('pk'), user=user_id)),
+        hidden=Exists(PostSellDeletes.objects.filter(post=OuterRef('pk'), user=user_id)),
+        interested=Exists(PostSellReceivedInterest.objects.filter(item=OuterRef('pk'), buyer__user=user_id)),
+    ).values('id', 'liked', 'hidden', 'interested')
+    return {row['id']: row for row in rows}
+
+
+def _pictures_by_post(post_ids, request):
+    pictures = list(PostSellPictures.objects.filter(post__in=post_ids).order_by('id'))
+    grouped = defaultdict(list)
+    for picture, data in zip(pictures, PostPicturesSerializerForViewing(pictures, many=True, context={'request': request}).data):
+        grouped[picture.post_id].append(data)
+    return grouped
+
+
+# Async API view to retrieve the details of many post sells at once
+class AsyncPostsSellBatchDetailView(AsyncReadView):
+    """
+    Async version of PostsSellBatchDetailView: the posts with their poster cards, their pictures and
+    the viewer flags are three queries run at the same time, merged into the PostDetailSerializer shape.
+    """
+    api_view_class = views.PostsSellBatchDetailView
+
+    async def get(self, request):
+        """
+        Retrieve the details of posts, e.g. ?ids=3,8,21&userId=5 (userId is optional, for the viewer flags).
+        Posts come back in the order of ids; ids that do not exist are skipped.
+        """
+        user_id = request.GET.get('userId')
+        try:
+            post_ids = views.parse_id_list(request.GET.get('ids'))
+        except ValueError as error:
+            return Response(str(error), status=400)
+
+        posts, pictures, flags = await gather_queries(
+            lambda: list(PostSerializerForGet.setup_eager_loading(PostSell.objects.filter(id__in=post_ids))),
+            lambda: _pictures_by_post(post_ids, request),
+            lambda: _viewer_flags(post_ids, user_id),
+        )
+        by_id = {post.id: post for post in posts}
+        posts = [by_id[pk] for pk in post_ids if pk in by_id]
+        data = PostSerializerForGet(posts, many=True, context={'request': request}).data
+        no_flags = {'liked': False, 'hidden': False, 'interested': False}
+        for row in data:
+            row_flags = flags.get(row['id'], no_flags)
+            row['pictures'] = pictures.get(row['id'], [])
+            row.update(liked=row_flags['liked'], hidden=row_flags['hidden'], interested=row_flags['interested'])
+
+        response = Response(data, status=200)
+        # Viewer flags make the response personal
+        if user_id:
+            patch_cache_control(response, private=True, max_age=30)
+        else:
+            patch_cache_control(response, public=True, max_age=60)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+def _latest_buyers_by_post(post_ids, request):
+    # The latest SellerInboxSerializer.LATEST_BUYERS interests of every post, in one query
+    interests = list(PostSellReceivedInterest.objects.filter(item__in=post_ids).annotate(
+        position=Window(RowNumber(), partition_by=[F('item')], order_by=[F('time').desc(), F('id').desc()]),
+    ).filter(position__lte=SellerInboxSerializer.LATEST_BUYERS).select_related('buyer__user').order_by('item', 'position'))
+    grouped = defaultdict(list)
+    for interest, data in zip(interests, InterestedBuyerSerializer(interests, many=True, context={'request': request}).data):
+        grouped[interest.item_id].append(data)
+    return grouped
+
+
+# Async API view to get the seller's interest inbox
+class AsyncSellerInterestInboxView(AsyncReadView):
+    """
+    Async version of SellerInterestInboxView: once the page of posts is known, their pictures and
+    latest buyers are two queries run at the same time, merged into the SellerInboxSerializer shape.
+    """
+    api_view_class = views.SellerInterestInboxView
+
+    async def get(self, request):
+        """
+        Get one page of the seller's posts with interest, the most recently wanted first, e.g. ?userId=5&page_size=20
+        """
+        user_id = request.GET.get('userId')
+
+        posts = PostSerializerForGet.setup_eager_loading(PostSell.objects.filter(poster__user=user_id)).annotate(
+            interest_count=Count('postsellreceivedinterest'),
+            latest_interest=Max('postsellreceivedinterest__time'),
+        ).filter(interest_count__gt=0)
+        try:
+            page, next_cursor = await sync_to_async(paginate_keyset)(posts, request.GET, 'latest_interest')
+        except ValueError as error:
+            return Response(str(error), status=400)
+
+        post_ids = [post.id for post in page]
+        pictures, buyers = await gather_queries(
+            lambda: _pictures_by_post(post_ids, request),
+            lambda: _latest_buyers_by_post(post_ids, request),
+        )
+        data = PostSerializerForGet(page, many=True, context={'request': request}).data
+        for post, row in zip(page, data):
+            row['item_pictures'] = pictures.get(post.id, [])
+            row['interest_count'] = post.interest_count
+            row['latest_interest'] = naturaltime(post.latest_interest)
+            row['latest_buyers'] = buyers.get(post.id, [])
+        return Response({'results': data, 'next': next_cursor}, status=200)
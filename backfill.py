@@ -0,0 +1,46 @@
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .geo import coordinate_fields
+
+# Data backfills for columns derived from other data.
+# They take the model classes as arguments so a migration can call them with its historical
+# models, e.g. RunPython(lambda apps, schema_editor: backfill_coordinates(apps.get_model('post', 'PostSell'))).
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_coordinates(post_model, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Fill lat/lng/geohash of posts saved before those columns existed. Returns the number of posts updated.
+    """
+    updated = 0
+    batch = []
+    posts = post_model.objects.filter(geohash='').only('id', 'latitude', 'longitude').order_by('id')
+    for post in posts.iterator(chunk_size=batch_size):
+        post.lat, post.lng, post.geohash = coordinate_fields(post.latitude, post.longitude)
+        if post.geohash:
+            batch.append(post)
+        if len(batch) == batch_size:
+            updated += post_model.objects.bulk_update(batch, ['lat', 'lng', 'geohash'])
+            batch = []
+    if batch:
+        updated += post_model.objects.bulk_update(batch, ['lat', 'lng', 'geohash'])
+    return updated
+
+
+def backfill_like_counts(post_model, like_model):
+    """
+    Recount like_count of every post from the like rows, in one UPDATE.
+    """
+    counts = like_model.objects.filter(post=OuterRef('pk')).values('post').annotate(total=Count('id')).values('total')
+    return post_model.objects.update(like_count=Coalesce(Subquery(counts), 0))
+
+
+def dedupe_interests(interest_model):
+    """
+    Keep only the first interest of every (buyer, item) pair, so the unique constraint can be added.
+    Returns the number of rows deleted.
+    """
+    first_ids = interest_model.objects.values('buyer', 'item').annotate(first=Min('id')).values('first')
+    deleted, _ = interest_model.objects.exclude(id__in=Subquery(first_ids)).delete()
+    return deleted
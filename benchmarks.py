@@ -0,0 +1,502 @@
+import asyncio
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from io import BytesIO
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from account.models import Profile, Account
+from .models import PostSell, PostSellPictures, PostSellLikes, PostSellDeletes, PostSellReceivedInterest
+from .serializers import PostSerializerForGet, PostListFastSerializer
+from .search_index import get_search_backend, FIELD_WEIGHTS
+from .backfill import backfill_like_counts
+from . import views, async_views
+
+# Benchmarks run against the configured database. Use a local SQLite copy, never production.
+# seed_database() fills it with a reproducible synthetic catalog, run_view_benchmarks() calls
+# every view and records latency percentiles, queries per request and peak Python memory, and
+# compare_results() flags regressions between two result files. Latency is timed in its own pass,
+# without tracemalloc or query capture, which both slow every call down.
+
+SEED_BATCH_SIZE = 2000
+
+# (city, neighborhoods, latitude, longitude, spread in degrees, share of posts)
+CITIES = [
+    ('Toronto', ('Annex', 'Leslieville', 'Liberty Village', 'Yorkville'), 43.6532, -79.3832, 0.08, 0.35),
+    ('Montreal', ('Plateau', 'Verdun', 'Rosemont', 'Griffintown'), 45.5019, -73.5674, 0.07, 0.25),
+    ('Vancouver', ('Kitsilano', 'Gastown', 'Mount Pleasant', 'West End'), 49.2827, -123.1207, 0.06, 0.2),
+    ('Ottawa', ('Glebe', 'Westboro', 'Centretown', 'Sandy Hill'), 45.4215, -75.6972, 0.05, 0.1),
+    ('Halifax', ('North End', 'South End', 'Clayton Park', 'Dartmouth'), 44.6488, -63.5752, 0.04, 0.1),
+]
+ITEMS = ['bike', 'sofa', 'desk', 'chair', 'lamp', 'bookshelf', 'stroller', 'guitar', 'monitor', 'jacket',
+         'table', 'mirror', 'kettle', 'skis', 'tent', 'camera', 'dresser', 'rug', 'speaker', 'scooter']
+ADJECTIVES = ['vintage', 'modern', 'small', 'large', 'wooden', 'black', 'white', 'red', 'folding', 'electric']
+CONDITIONS = [('like new', 0.2), ('good', 0.45), ('fair', 0.25), ('for parts', 0.1)]
+SIZES = ['S', 'M', 'L', 'XL', 'one size']
+
+
+def _batches(rows, size=SEED_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _random_post(rng, poster, now, days):
+    city, neighborhoods, lat, lng, spread, _ = rng.choices(CITIES, weights=[city[5] for city in CITIES])[0]
+    item = rng.choice(ITEMS)
+    title = '%s %s' % (rng.choice(ADJECTIVES), item)
+    return PostSell(
+        poster=poster,
+        title=title.capitalize(),
+        description='%s in %s condition, pick up in %s.' % (title, rng.choice(CONDITIONS)[0], city),
+        latitude='%.6f' % rng.gauss(lat, spread),
+        longitude='%.6f' % rng.gauss(lng, spread),
+        price=max(1, int(rng.lognormvariate(4.0, 1.1))),  # Median around 55, long tail
+        size=rng.choice(SIZES),
+        time=now - timedelta(seconds=rng.randrange(days * 86400)),
+        street_no=str(rng.randrange(1, 999)),
+        street='Main St',
+        neighborhood=rng.choice(neighborhoods),
+        city=city,
+        country='Canada',
+        postal_code='A1A 1A1',
+        condition=rng.choices([c for c, _ in CONDITIONS], weights=[w for _, w in CONDITIONS])[0],
+        age=rng.randrange(1, 24),
+        age_unit=rng.choice(['months', 'years']),
+    )
+
+
+def _random_pairs(rng, count, left, right):
+    # Unique (left, right) pairs, drawn until there are enough distinct ones
+    pairs = set()
+    limit = min(count, len(left) * len(right))
+    while len(pairs) < limit:
+        pairs.add((rng.choice(left), rng.choice(right)))
+    return pairs
+
+
+def seed_database(posts=100000, likes=250000, hides=250000, interests=50000, users=5000,
+                  pictures_per_post=2, days=180, seed=42):
+    """
+    Fill the database with a reproducible synthetic catalog: posts clustered around a few cities
+    with log-normal prices, plus likes, hides, interests and picture rows. Returns the volumes.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    with transaction.atomic():
+        accounts = Account.objects.bulk_create(
+            Account(**{Account.USERNAME_FIELD: 'bench-user-%d@example.com' % index, 'first_name': 'User%d' % index})
+            for index in range(users)
+        )
+        profiles = Profile.objects.bulk_create(Profile(user=account) for account in accounts)
+
+    post_ids = []
+    for batch in _batches(_random_post(rng, rng.choice(profiles), now, days) for _ in range(posts)):
+        for post in batch:
+            post.update_geo_fields()
+        with transaction.atomic():
+            created = PostSell.objects.bulk_create(batch)
+            post_ids.extend(post.pk for post in created)
+            PostSellPictures.objects.bulk_create(
+                PostSellPictures(post=post, image='post_sell_pics/bench_%d_%d.jpg' % (post.pk, index))
+                for post in created for index in range(pictures_per_post)
+            )
+
+    account_ids = [account.pk for account in accounts]
+    for model, count in ((PostSellLikes, likes), (PostSellDeletes, hides)):
+        rows = (model(user_id=user_id, post_id=post_id, time=now - timedelta(seconds=rng.randrange(days * 86400)))
+                for user_id, post_id in _random_pairs(rng, count, account_ids, post_ids))
+        for batch in _batches(rows):
+            model.objects.bulk_create(batch)
+
+    profile_ids = [profile.pk for profile in profiles]
+    rows = (PostSellReceivedInterest(buyer_id=buyer_id, item_id=item_id,
+                                     time=now - timedelta(seconds=rng.randrange(days * 86400)))
+            for buyer_id, item_id in _random_pairs(rng, interests, profile_ids, post_ids))
+    for batch in _batches(rows):
+        PostSellReceivedInterest.objects.bulk_create(batch)
+
+    # bulk_create skipped the like counter signals and the search index
+    backfill_like_counts(PostSell, PostSellLikes)
+    get_search_backend().rebuild(PostSell.objects.only('id', *FIELD_WEIGHTS).iterator(chunk_size=SEED_BATCH_SIZE))
+    return {'users': users, 'posts': posts, 'likes': likes, 'hides': hides, 'interests': interests,
+            'pictures': posts * pictures_per_post}
+
+
+def _timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def benchmark_list_serializers(count=1000, repeat=5):
+    """
+    Time PostSerializerForGet against PostListFastSerializer on the latest count posts,
+    including the query. Returns {'rows', 'model_serializer_ms', 'fast_serializer_ms', 'speedup'}.
+    """
+    request = APIRequestFactory().get('/')
+    context = {'request': request}
+    posts = PostSell.objects.order_by('-time', '-id')
+
+    def model_serializer():
+        queryset = PostSerializerForGet.setup_eager_loading(posts)[:count]
+        return PostSerializerForGet(queryset, many=True, context=context).data
+
+    def fast_serializer():
+        queryset = PostListFastSerializer.prepare(posts)[:count]
+        return PostListFastSerializer(queryset, many=True, context=context).data
+
+    rows = len(fast_serializer())
+    model_ms = statistics.median(_timed(model_serializer, repeat)) * 1000
+    fast_ms = statistics.median(_timed(fast_serializer, repeat)) * 1000
+    return {
+        'rows': rows,
+        'model_serializer_ms': round(model_ms, 2),
+        'fast_serializer_ms': round(fast_ms, 2),
+        'speedup': round(model_ms / fast_ms, 2) if fast_ms else None,
+    }
+
+
+def _sample():
+    """
+    Pick the ids used by the scenarios: a busy user, one of their likes/hides, a post with pictures.
+    """
+    like = PostSellLikes.objects.values('user_id').annotate(total=Count('id')).order_by('-total').first()
+    user_id = like['user_id'] if like else Account.objects.values_list('pk', flat=True).first()
+    post = PostSell.objects.order_by('-time').values('id', 'poster_id', 'lat', 'lng', 'poster__user_id').first()
+    liked = PostSellLikes.objects.filter(user=user_id).values_list('post_id', flat=True).first()
+    hidden = PostSellDeletes.objects.filter(user=user_id).values_list('post_id', flat=True).first()
+    feed_ids = list(PostSell.objects.order_by('-time').values_list('id', flat=True)[:20])
+    return {'user_id': user_id, 'post': post, 'liked': liked or post['id'], 'hidden': hidden or post['id'],
+            'feed_ids': ','.join(str(pk) for pk in feed_ids)}
+
+
+def _scenarios(sample):
+    """
+    (name, view class, method, params or body, view kwargs, authenticate) for every read view.
+    """
+    user_id, post = sample['user_id'], sample['post']
+    lat, lng = post['lat'] or 43.65, post['lng'] or -79.38
+    box = {'south': lat - 0.05, 'west': lng - 0.07, 'north': lat + 0.05, 'east': lng + 0.07}
+    page = {'page_size': 20}
+    return [
+        ('feed', views.SearchPostSellsForViewing, 'get', {}, {}, True),
+        ('feed_page', views.SearchPostSellsForViewing, 'get', page, {}, True),
+        ('feed_search', views.SearchPostSellsForViewing, 'get', dict(page, q='vintage bi'), {}, True),
+        ('feed_search_relevance', views.SearchPostSellsForViewing, 'get', dict(page, q='vintage bi', sort='relevance'), {}, True),
+        ('feed_price_band', views.SearchPostSellsForViewing, 'get', dict(page, price_min=20, price_max=80), {}, True),
+        ('feed_facets', views.SearchPostSellsForViewing, 'get', dict(page, q='vintage bi', facets=1), {}, True),
+        ('feed_stream', views.SearchPostSellsForViewing, 'get', {'stream': 1}, {}, True),
+        ('map', views.SearchPostSellsForViewingOnMap, 'get', {}, {}, True),
+        ('map_viewport', views.SearchPostSellsForViewingOnMap, 'get', box, {}, True),
+        ('map_radius', views.SearchPostSellsForViewingOnMap, 'get', {'lat': lat, 'lng': lng, 'radius': 3}, {}, True),
+        ('map_clustered', views.SearchPostSellsForViewingOnMap, 'get', dict(box, clustered=1, zoom=11), {}, True),
+        ('posts_of_user', views.AllPostOfOneUser, 'get', {'id': post['poster_id']}, {}, False),
+        ('posts_of_user_page', views.AllPostOfOneUser, 'get', dict(page, id=post['poster_id']), {}, False),
+        ('post_detail', views.PostsSellDetailedView, 'post', {'id': post['id']}, {}, False),
+        ('post_detail_batch', views.PostsSellBatchDetailView, 'get', {'ids': sample['feed_ids'], 'userId': user_id}, {}, False),
+        ('post_pictures', views.PostPicturesSerilizerforViewingView, 'get', {'post_id': post['id']}, {}, False),
+        ('similar', views.SimilarPostsView, 'get', {'postId': post['id'], 'userId': user_id}, {}, False),
+        ('liked_per_post', views.GetLikedPostsPerUserPerPostView, 'get', {'userId': user_id, 'postId': sample['liked']}, {}, False),
+        ('liked', views.GetLikedPostsPerUserView, 'get', {'userId': user_id}, {}, False),
+        ('liked_page', views.GetLikedPostsPerUserView, 'get', dict(page, userId=user_id), {}, False),
+        ('viewer_state', views.PostViewerStateView, 'get', {'userId': user_id, 'ids': sample['feed_ids']}, {}, False),
+        ('hidden_per_post', views.GetDeletedPostsPerUserPerPostView, 'get', {'userId': user_id, 'postId': sample['hidden']}, {}, False),
+        ('hidden', views.GetDeletedPostsPerUserView, 'get', {'userId': user_id}, {}, False),
+        ('interest_per_post', views.GetReceivedInterestPerUserPerPostView, 'get', {'userId': post['poster__user_id'], 'postId': post['id']}, {}, False),
+        ('interest', views.GetReceivedInterestPerUserView, 'get', {'userId': post['poster__user_id']}, {}, False),
+        ('interest_inbox', views.SellerInterestInboxView, 'get', {'userId': post['poster__user_id'], 'page_size': 20}, {}, False),
+        ('metrics', views.MetricsView, 'get', {}, {}, False),
+    ]
+
+
+def _upload():
+    # A small JPEG upload, made anew for every call since the view consumes the file
+    buffer = BytesIO()
+    Image.new('RGB', (640, 480), (180, 120, 60)).save(buffer, 'JPEG')
+    return SimpleUploadedFile('benchmark.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+def _write_scenarios(sample):
+    """
+    Write views as (name, view class, method, body, view kwargs, setup, cleanup). setup runs before
+    and cleanup after every call, outside the timings, so each call sees the same data and the
+    dataset is unchanged afterwards. A callable body is called for every request.
+    """
+    user_id, post = sample['user_id'], sample['post']
+    new_post = {
+        'poster': post['poster__user_id'], 'title': 'Benchmark lamp', 'latitude': '43.65', 'longitude': '-79.38',
+        'price': 25, 'size': 'M', 'description': 'Benchmark post', 'street_no': '1', 'street': 'Main St',
+        'neighborhood': 'Annex', 'city': 'Toronto', 'country': 'Canada', 'postal_code': 'A1A 1A1',
+        'condition': 'good', 'age': 2, 'age_unit': 'years',
+    }
+    target = PostSell.objects.exclude(postselllikes__user=user_id).exclude(postselldeletes__user=user_id).values_list('id', flat=True).first()
+
+    def cleanup_post():
+        PostSell.objects.filter(title='Benchmark lamp').delete()
+
+    def cleanup_hide():
+        PostSellDeletes.objects.filter(user=user_id, post=target).delete()
+
+    def add_like():
+        PostSellLikes.objects.get_or_create(user_id=user_id, post_id=target)
+
+    def cleanup_like():
+        PostSellLikes.objects.filter(user=user_id, post=target).delete()
+
+    def add_interest():
+        PostSellReceivedInterest.objects.get_or_create(buyer_id=post['poster_id'], item_id=target)
+
+    def cleanup_interest():
+        PostSellReceivedInterest.objects.filter(buyer=post['poster_id'], item=target).delete()
+
+    def cleanup_pictures():
+        for picture in PostSellPictures.objects.filter(post=target, image__contains='benchmark'):
+            picture.image.delete(save=False)
+            picture.delete()
+
+    return [
+        ('create_post', views.PostSellForPostingView, 'post', new_post, {}, None, cleanup_post),
+        ('create_posts_batch', views.PostSellBatchPostingView, 'post', {'posts': [new_post] * 10}, {}, None, cleanup_post),
+        ('create_picture', views.PostPicturesSerilizerforCreatingView, 'post',
+         lambda: {'post': target, 'image': _upload()}, {}, None, cleanup_pictures),
+        ('like', views.LikePostView, 'post', {'post': target, 'user': user_id}, {}, cleanup_like, cleanup_like),
+        ('unlike', views.LikePostDeleteView, 'delete', {}, {'post_id': target, 'user_id': user_id}, add_like, cleanup_like),
+        ('hide', views.DeletePostView, 'post', {'post': target, 'user': user_id}, {}, cleanup_hide, cleanup_hide),
+        ('action_sync', views.PostActionSyncView, 'post', {'user': user_id, 'actions': [
+            {'op': 'like', 'post': target}, {'op': 'unlike', 'post': target}, {'op': 'hide', 'post': target},
+        ]}, {}, cleanup_hide, cleanup_hide),
+        ('interest_create', views.ReceivedInterestCreateView, 'post', {'buyer': post['poster_id'], 'item': target}, {},
+         cleanup_interest, cleanup_interest),
+        ('interest_delete', views.ReceivedInterestDeleteView, 'delete', {},
+         {'post_id': target, 'user_id': post['poster__user_id']}, add_interest, cleanup_interest),
+    ]
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _run(view_class, method, data, kwargs, user, clear_cache):
+    factory = APIRequestFactory()
+    if callable(data):
+        data = data()
+    if method == 'get':
+        request = factory.get('/', data)
+    else:
+        uploads = any(hasattr(value, 'read') for value in data.values())
+        request = getattr(factory, method)('/', data, format='multipart' if uploads else 'json')
+    if user is not None:
+        force_authenticate(request, user=user)
+    if clear_cache:
+        cache.clear()
+    response = view_class.as_view()(request, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if getattr(response, 'streaming', False):
+        return response.status_code, sum(len(part) for part in response.streaming_content)
+    return response.status_code, len(response.content)
+
+
+def _measure(view_class, method, data, kwargs, user, iterations, setup=None, cleanup=None, clear_cache=True):
+    latencies, queries, sizes, statuses = [], [], [], set()
+    # Latency pass: nothing but the call is timed
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        status, size = _run(view_class, method, data, kwargs, user, clear_cache)
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(size)
+        statuses.add(status)
+        if cleanup:
+            cleanup()
+
+    # Instrumented pass: queries per request and peak memory, timings not kept
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            if setup:
+                setup()
+            with CaptureQueriesContext(connection) as context:
+                status, size = _run(view_class, method, data, kwargs, user, clear_cache)
+            queries.append(len(context))
+            statuses.add(status)
+            if cleanup:
+                cleanup()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    metrics = {
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p90_ms': round(_percentile(latencies, 90), 3),
+        'p99_ms': round(_percentile(latencies, 99), 3),
+        'queries': max(queries),
+        'response_bytes': max(sizes),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'statuses': sorted(statuses),
+    }
+    # A scenario timing an error response measures nothing useful: report it as failed
+    failed = sorted(status for status in statuses if not 200 <= status < 300)
+    if failed:
+        metrics['error'] = 'Non-2xx responses: %s' % ', '.join(str(status) for status in failed)
+    return metrics
+
+
+def run_view_benchmarks(iterations=20):
+    """
+    Run every view and return {scenario: metrics}. The response cache is cleared before every
+    call so the numbers reflect the database path; 'feed_cached' measures the cached path.
+    Scenarios that fail, or answer anything but 2xx, are reported with an error instead of stopping the run.
+    """
+    sample = _sample()
+    user = Account.objects.get(pk=sample['user_id'])
+    results = {}
+    scenarios = [(name, view, method, data, kwargs, user if auth else None, None, None, True)
+                 for name, view, method, data, kwargs, auth in _scenarios(sample)]
+    scenarios.append(('feed_cached', views.SearchPostSellsForViewing, 'get', {'page_size': 20}, {}, user, None, None, False))
+    scenarios += [(name, view, method, data, kwargs, None, setup, cleanup, True)
+                  for name, view, method, data, kwargs, setup, cleanup in _write_scenarios(sample)]
+    for name, view_class, method, data, kwargs, scenario_user, setup, cleanup, clear_cache in scenarios:
+        try:
+            results[name] = _measure(view_class, method, data, kwargs, scenario_user, iterations, setup, cleanup, clear_cache)
+        except Exception as error:  # Keep going: a broken view is a result too
+            results[name] = {'error': '%s: %s' % (type(error).__name__, error)}
+    return results
+
+
+def _load_pairs(sample):
+    """
+    (name, sync view class, async view class, params) for every view with an async version.
+    """
+    user_id, post = sample['user_id'], sample['post']
+    return [
+        ('post_detail_batch', views.PostsSellBatchDetailView, async_views.AsyncPostsSellBatchDetailView,
+         {'ids': sample['feed_ids'], 'userId': user_id}),
+        ('interest_inbox', views.SellerInterestInboxView, async_views.AsyncSellerInterestInboxView,
+         {'userId': post['poster__user_id'], 'page_size': 20}),
+    ]
+
+
+def _rendered(view):
+    def call(request):
+        response = view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    return call
+
+
+async def _load(view, params, concurrency, total):
+    factory = RequestFactory()
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = set()
+
+    async def one():
+        async with semaphore:
+            response = await view(factory.get('/', params))
+            statuses.add(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started), sorted(statuses)
+
+
+def run_async_load_test(concurrency=50, total=500):
+    """
+    Send total requests, concurrency at a time, to the two views that have an async version
+    (batch post detail and seller interest inbox) and to their sync originals, the way one
+    ASGI worker serves them: sync views share the worker's single sync thread, async views run on the
+    event loop. Returns {scenario: requests per second of both}. Needs a file database (not :memory:)
+    since the async views query from worker threads. On SQLite expect no gain (speedup around 1 or
+    below); only a server database with network latency can show one.
+    """
+    sample = _sample()
+    results = {}
+    for name, sync_view, async_view, params in _load_pairs(sample):
+        cache.clear()
+        sync_rps, sync_statuses = asyncio.run(_load(sync_to_async(_rendered(sync_view.as_view())), params, concurrency, total))
+        cache.clear()
+        async_rps, async_statuses = asyncio.run(_load(async_view.as_view(), params, concurrency, total))
+        results[name] = {
+            'sync_rps': round(sync_rps, 1),
+            'async_rps': round(async_rps, 1),
+            'speedup': round(async_rps / sync_rps, 2) if sync_rps else None,
+            'statuses': sorted(set(sync_statuses) | set(async_statuses)),
+        }
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_report(results, volumes=None):
+    """
+    Wrap results with what is needed to compare runs: commit, time, database, volumes.
+    """
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'time': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'posts': PostSell.objects.count(),
+            'volumes': volumes,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Return a list of regressions between two reports: failing scenarios (errors or non-2xx answers),
+    p50/p99 latency more than threshold slower, or more queries per request. Timings of scenarios
+    missing from either side are not compared.
+    """
+    regressions = []
+    for name, after in current['results'].items():
+        before = baseline['results'].get(name)
+        if 'error' in after:
+            regressions.append('%s: fails (%s)' % (name, after['error']))
+            continue
+        if not before or 'error' in before:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if before[metric] and after[metric] > before[metric] * (1 + threshold):
+                regressions.append('%s: %s %.2f -> %.2f' % (name, metric, before[metric], after[metric]))
+        if after['queries'] > before['queries']:
+            regressions.append('%s: queries %d -> %d' % (name, before['queries'], after['queries']))
+    return regressions
+
+
+def load_report(path):
+    with open(path) as handle:
+        return json.load(handle)
@@ -0,0 +1,62 @@
+from collections import Counter
+from django.conf import settings
+from django.db.models import Case, When, Value, Count, IntegerField
+
+# Facet counts for the feed filters (condition, city, neighborhood, price histogram).
+# All facets come from one aggregate query over the already filtered queryset: rows are grouped by
+# the combination of every facet column and the combinations are rolled up per facet in Python.
+# The number of combinations depends on the catalog's variety, not its size, so the rows sent
+# back stay small as posts grow. Counts are part of the shared cached search response, so like
+# map clusters they include posts the user hid.
+
+PRICE_EDGES = getattr(settings, 'POST_SELL_PRICE_FACET_EDGES', (0, 25, 50, 100, 250, 500, 1000))
+FACET_LIMIT = getattr(settings, 'POST_SELL_FACET_LIMIT', 20)  # Values returned per facet, most common first
+TEXT_FACETS = ('condition', 'city', 'neighborhood')
+
+
+def wants_facets(params):
+    """
+    Facets are opt-in so existing clients keep receiving the same JSON.
+    """
+    return params.get('facets') in ('1', 'true')
+
+
+def price_bucket_label(index):
+    """
+    Label of the price bucket at index, e.g. '25-50', or '1000+' for the last one.
+    """
+    if index + 1 < len(PRICE_EDGES):
+        return '%d-%d' % (PRICE_EDGES[index], PRICE_EDGES[index + 1])
+    return '%d+' % PRICE_EDGES[index]
+
+
+def _price_bucket():
+    # Index of the bucket a price falls in; prices below the first edge go in the first bucket
+    cases = [When(price__lt=edge, then=Value(index)) for index, edge in enumerate(PRICE_EDGES[1:])]
+    return Case(*cases, default=Value(len(PRICE_EDGES) - 1), output_field=IntegerField())
+
+
+def facet_counts(queryset):
+    """
+    Return {'condition': [{'value', 'count'}], 'city': [...], 'neighborhood': [...], 'price': [{'range', 'count'}]}
+    for the posts of queryset, in one query. Text facets keep their FACET_LIMIT most common values;
+    price buckets are all returned, in price order, empty ones included.
+    """
+    rows = queryset.order_by().annotate(price_bucket=_price_bucket()).values(
+        *TEXT_FACETS, 'price_bucket'
+    ).annotate(count=Count('id'))
+
+    counters = {name: Counter() for name in TEXT_FACETS}
+    prices = [0] * len(PRICE_EDGES)
+    for row in rows:
+        for name in TEXT_FACETS:
+            counters[name][row[name]] += row['count']
+        prices[row['price_bucket']] += row['count']
+
+    facets = {
+        name: [{'value': value, 'count': count}
+               for value, count in sorted(counter.items(), key=lambda item: (-item[1], item[0]))[:FACET_LIMIT]]
+        for name, counter in counters.items()
+    }
+    facets['price'] = [{'range': price_bucket_label(index), 'count': count} for index, count in enumerate(prices)]
+    return facets
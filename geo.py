@@ -0,0 +1,161 @@
+import math
+from django.db.models import Q
+
+# Geospatial helpers for posts. Coordinates are indexed with a geohash so that a
+# map viewport can be turned into a handful of index range scans.
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # Precision stored on PostSell (~5m cells)
+MAX_COVER_CELLS = 32  # Upper bound on cells used to cover a viewport
+EARTH_RADIUS_KM = 6371.0088
+
+
+def parse_coordinate(value, limit):
+    """
+    Parse a latitude/longitude value (stored as text on older rows) into a float.
+    Returns None when the value is missing or outside [-limit, limit].
+    """
+    try:
+        coordinate = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(coordinate) or not -limit <= coordinate <= limit:
+        return None
+    return coordinate
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """
+    Encode a coordinate into a geohash string of the given precision.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            bounds[0] = mid
+        else:
+            ch = ch << 1
+            bounds[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(GEOHASH_BASE32[ch])
+            bit, ch = 0, 0
+    return ''.join(chars)
+
+
+def coordinate_fields(latitude, longitude):
+    """
+    Return the (lat, lng, geohash) stored on a post for its latitude/longitude text,
+    or (None, None, '') when the text is not a valid coordinate.
+    """
+    lat = parse_coordinate(latitude, 90)
+    lng = parse_coordinate(longitude, 180)
+    if lat is None or lng is None:
+        return None, None, ''
+    return lat, lng, geohash_encode(lat, lng)
+
+
+def geohash_cell_size(precision):
+    """
+    Return the (lat, lng) size in degrees of a geohash cell of the given precision.
+    """
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _cover_precision(south, west, north, east):
+    """
+    Pick the finest geohash precision that covers the box in at most MAX_COVER_CELLS cells.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_size, lng_size = geohash_cell_size(precision)
+        rows = math.floor(north / lat_size) - math.floor(south / lat_size) + 1
+        cols = math.floor(east / lng_size) - math.floor(west / lng_size) + 1
+        if rows * cols <= MAX_COVER_CELLS:
+            return precision
+    return 0
+
+
+def geohash_cover(south, west, north, east):
+    """
+    Return a sorted list of geohash prefixes whose cells together cover the bounding box.
+    An empty list means the box is too large to be worth covering (use the lat/lng range only).
+    """
+    precision = _cover_precision(south, west, north, east)
+    if precision == 0:
+        return []
+    lat_size, lng_size = geohash_cell_size(precision)
+    cells = set()
+    lat = math.floor(south / lat_size) * lat_size
+    while lat <= north:
+        lng = math.floor(west / lng_size) * lng_size
+        while lng <= east:
+            # Encode the cell centre so floating point edges never spill into a neighbour
+            cells.add(geohash_encode(min(lat + lat_size / 2, 90.0), min(lng + lng_size / 2, 180.0), precision))
+            lng += lng_size
+        lat += lat_size
+    return sorted(cells)
+
+
+def bbox_around(lat, lng, radius_km):
+    """
+    Return the (south, west, north, east) box enclosing a circle of radius_km around a point.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        lng_delta = 180.0
+    else:
+        lng_delta = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (max(-90.0, lat - lat_delta), max(-180.0, lng - lng_delta),
+            min(90.0, lat + lat_delta), min(180.0, lng + lng_delta))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def viewport_q(south, west, north, east):
+    """
+    Build a Q object matching posts inside the box. Boxes crossing the antimeridian
+    (west > east) are split in two. The geohash ranges let the database use the
+    (geohash, lat, lng) index instead of scanning every post.
+    """
+    if west > east:
+        return viewport_q(south, west, north, 180.0) | viewport_q(south, -180.0, north, east)
+    box = Q(lat__range=(south, north), lng__range=(west, east))
+    cells = geohash_cover(south, west, north, east)
+    if not cells:
+        return box
+    # '~' sorts after every base32 character, so [cell, cell + '~') is the prefix range
+    cell_q = Q()
+    for cell in cells:
+        cell_q |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+    return cell_q & box
+
+
+def precision_for_zoom(zoom):
+    """
+    Pick the geohash precision used to cluster pins at a web map zoom level,
+    aiming for roughly four clusters across a 256px tile.
+    """
+    target = 360.0 / (1 << max(0, min(zoom, 30))) / 4
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        if geohash_cell_size(precision)[1] <= target:
+            return precision
+    return GEOHASH_PRECISION
@@ -0,0 +1,67 @@
+import bisect
+import uuid
+from array import array
+from django.conf import settings
+from django.core.cache import cache
+from .models import PostSellDeletes
+
+# Per-user set of hidden (PostSellDeletes) post ids, kept in the cache backend as a
+# sorted array of 64-bit ints so feed requests do not query PostSellDeletes every time.
+# The array is stored under a per-user version token. Hides and un-hides replace the token
+# (a single cache write, so concurrent writers cannot lose each other's change), and the next read
+# rebuilds the array from the table. A read that raced a hide stored its array under the old token,
+# which is never read again.
+
+CACHE_TIMEOUT = getattr(settings, 'POST_SELL_HIDDEN_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _version_key(user_id):
+    return 'post_sell:hidden_version:%s' % user_id
+
+
+def _cache_key(user_id, version):
+    return 'post_sell:hidden:%s:%s' % (user_id, version)
+
+
+def _load(data):
+    ids = array('q')
+    ids.frombytes(data)
+    return ids
+
+
+def _version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # add() keeps the token of a concurrent reader that got there first
+        cache.add(_version_key(user_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def get_hidden_post_ids(user_id):
+    """
+    Return the sorted array of post ids the user has hidden from their feed.
+    """
+    version = _version(user_id)
+    data = cache.get(_cache_key(user_id, version)) if version else None
+    if data is not None:
+        return _load(data)
+    ids = array('q', PostSellDeletes.objects.filter(user=user_id).order_by('post_id').values_list('post_id', flat=True))
+    if version:
+        cache.set(_cache_key(user_id, version), ids.tobytes(), CACHE_TIMEOUT)
+    return ids
+
+
+def is_hidden(hidden_ids, post_id):
+    """
+    Binary search in an array returned by get_hidden_post_ids.
+    """
+    position = bisect.bisect_left(hidden_ids, post_id)
+    return position < len(hidden_ids) and hidden_ids[position] == post_id
+
+
+def invalidate_hidden_posts(user_id):
+    """
+    Forget the user's cached hidden set after hides or un-hides were committed.
+    """
+    cache.set(_version_key(user_id), uuid.uuid4().hex, CACHE_TIMEOUT)
@@ -0,0 +1,249 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+# Optional in-process columnar snapshot of the recent posts (the "hot set").
+# Most reads are about the last few weeks of listings. The snapshot keeps their id, time, price and
+# coordinates in NumPy columns sorted by (time, id), so the feed's price filters, the map viewport
+# and -time keyset ordering run as vectorized operations; the database is only asked for the rows
+# of the final page. Every use first reads the posts of the last OVERLAP_SECONDS before the newest
+# time seen, a cheap indexed query, so new posts show up at once, including those whose time was set
+# before a slower transaction committed them. Edits and deletes made by this process are applied by
+# the signals; those made by other processes are picked up by the full reload every
+# FULL_RELOAD_INTERVAL seconds, which also drops posts that left the window. The reload runs in a
+# background thread and is swapped in when ready. Until then the page hydration simply skips posts
+# that no longer exist.
+# Turn it on with POST_SELL_HOT_SET = True. POST_SELL_HOT_SET_DAYS = None keeps every post, which
+# lets the map use it as well.
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, 'POST_SELL_HOT_SET', False)
+WINDOW_DAYS = getattr(settings, 'POST_SELL_HOT_SET_DAYS', 28)
+FULL_RELOAD_INTERVAL = getattr(settings, 'POST_SELL_HOT_SET_RELOAD', 600)  # Seconds
+OVERLAP_SECONDS = getattr(settings, 'POST_SELL_HOT_SET_OVERLAP', 120)  # Longest expected gap between a post's time and its commit
+COLUMNS = ('id', 'time', 'price', 'lat', 'lng')
+LOAD_CHUNK_SIZE = 5000
+MAX_HYDRATE_IDS = 1000  # Longer id lists are left to the database's own filters rather than a huge IN (...)
+
+
+def _micros(value):
+    # Datetimes are kept as int64 microseconds since the epoch so cursor comparisons are exact
+    return int(value.timestamp()) * 1000000 + value.microsecond
+
+
+def _datetime(micros):
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(microseconds=int(micros))
+
+
+class HotSet:
+    """
+    Columns of the posts created since window_start (or of every post when WINDOW_DAYS is None),
+    in ascending (time, id) order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()  # Held by the thread loading or reloading the snapshot
+        self._reset()
+
+    def _reset(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=np.int64)
+        self.prices = np.zeros(0, dtype=np.int64)
+        # Same doubles as the lat/lng columns, so viewport edges compare exactly like in the database
+        self.lats = np.zeros(0, dtype=np.float64)
+        self.lngs = np.zeros(0, dtype=np.float64)
+        self.active = np.zeros(0, dtype=bool)
+        self.window_start = None  # Microseconds; None when every post is kept
+        self._newest = None  # Largest time (microseconds) read from the database
+        self._reloaded = None
+        self._reloading = None  # Edits and deletes made while a reload runs, replayed on its result
+
+    def _append(self, rows):
+        # Called with the lock held. Rows already in the snapshot (read again by the overlap) are
+        # skipped; late rows older than the newest one are sorted into place.
+        if not rows:
+            return
+        ids, times, prices, lats, lngs = zip(*rows)
+        ids = np.array(ids, dtype=np.int64)
+        times = np.array([_micros(value) for value in times], dtype=np.int64)
+        # Only the rows at least as recent as the oldest one read can be duplicates
+        new = ~np.isin(ids, self.ids[np.searchsorted(self.times, times.min()):])
+        if not new.any():
+            return
+        times = times[new]
+        coordinates = np.array([(np.nan if lat is None else lat, np.nan if lng is None else lng)
+                                for lat, lng in zip(lats, lngs)], dtype=np.float64)[new]
+        in_order = not len(self.ids) or (times[0], ids[new][0]) > (self.times[-1], self.ids[-1])
+        self.ids = np.concatenate([self.ids, ids[new]])
+        self.times = np.concatenate([self.times, times])
+        self.prices = np.concatenate([self.prices, np.array(prices, dtype=np.int64)[new]])
+        self.lats = np.concatenate([self.lats, coordinates[:, 0]])
+        self.lngs = np.concatenate([self.lngs, coordinates[:, 1]])
+        self.active = np.concatenate([self.active, np.ones(len(times), dtype=bool)])
+        if not in_order:
+            order = np.lexsort((self.ids, self.times))
+            for name in ('ids', 'times', 'prices', 'lats', 'lngs', 'active'):
+                setattr(self, name, getattr(self, name)[order])
+        self._newest = int(self.times[-1])
+
+    def _read_new(self):
+        # Read the posts of the overlap before the newest time seen (everything in the window at first)
+        from .models import PostSell
+        rows = PostSell.objects.order_by('time', 'id').values_list(*COLUMNS)
+        if self._newest is not None:
+            rows = rows.filter(time__gte=_datetime(self._newest - OVERLAP_SECONDS * 1000000))
+        elif self.window_start is not None:
+            rows = rows.filter(time__gte=_datetime(self.window_start))
+        chunk = []
+        for row in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            chunk.append(row)
+            if len(chunk) == LOAD_CHUNK_SIZE:
+                with self._lock:
+                    self._append(chunk)
+                chunk = []
+        with self._lock:
+            self._append(chunk)
+
+    def _start_window(self):
+        if WINDOW_DAYS is not None:
+            self.window_start = _micros(timezone.now() - timedelta(days=WINDOW_DAYS))
+
+    def refresh(self):
+        """
+        Read the recent posts, after loading the snapshot on first use. When the full reload is due
+        it is started in a background thread; this call goes on with the current snapshot.
+        """
+        if self._reloaded is None:
+            with self._reload_lock:
+                if self._reloaded is None:
+                    self._start_window()
+                    self._read_new()
+                    self._reloaded = time.monotonic()
+                    return
+        elif time.monotonic() - self._reloaded > FULL_RELOAD_INTERVAL and self._reload_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload, name='hot-set-reload', daemon=True).start()
+        self._read_new()
+
+    def _reload(self):
+        # Runs in its own thread with _reload_lock held; the fresh snapshot replaces this one's
+        # columns once loaded, with the changes made meanwhile applied to it.
+        try:
+            with self._lock:
+                self._reloading = []
+            fresh = HotSet()
+            fresh._start_window()
+            fresh._read_new()
+            with self._lock:
+                for change, value in self._reloading:
+                    if change == 'update':
+                        fresh._update(*value)
+                    else:
+                        fresh.active[fresh.ids == value] = False
+                for name in ('ids', 'times', 'prices', 'lats', 'lngs', 'active', 'window_start', '_newest'):
+                    setattr(self, name, getattr(fresh, name))
+                self._reloaded = time.monotonic()
+        except Exception:
+            logger.exception('Reloading the hot set failed')
+        finally:
+            with self._lock:
+                self._reloading = None
+            connection.close()  # This thread's own connection
+            self._reload_lock.release()
+
+    def _update(self, post_id, price, lat, lng):
+        rows = np.flatnonzero(self.ids == post_id)
+        if len(rows):
+            self.prices[rows] = price
+            self.lats[rows] = np.nan if lat is None else lat
+            self.lngs[rows] = np.nan if lng is None else lng
+
+    def update_post(self, post):
+        """
+        Apply an edit made in this process. New posts are left to refresh() so the order stays sorted.
+        """
+        change = (post.pk, post.price, post.lat, post.lng)
+        with self._lock:
+            self._update(*change)
+            if self._reloading is not None:
+                self._reloading.append(('update', change))
+
+    def remove_post(self, post_id):
+        """
+        Apply a delete made in this process.
+        """
+        with self._lock:
+            self.active[self.ids == post_id] = False
+            if self._reloading is not None:
+                self._reloading.append(('remove', post_id))
+
+    def query(self, price_min=None, price_max=None, box=None, ids=None, before=None, limit=None):
+        """
+        Return (ids, times) of the matching posts, newest first. before is a (time, id) keyset cursor
+        in microseconds; limit caps the number of rows returned.
+        """
+        with self._lock:
+            mask = self.active.copy()
+            if price_min is not None:
+                mask &= self.prices >= price_min
+            if price_max is not None:
+                mask &= self.prices <= price_max
+            if box is not None:
+                south, west, north, east = box
+                mask &= (self.lats >= south) & (self.lats <= north)
+                if west <= east:
+                    mask &= (self.lngs >= west) & (self.lngs <= east)
+                else:  # Viewport across the antimeridian
+                    mask &= (self.lngs >= west) | (self.lngs <= east)
+            if ids is not None:
+                mask &= np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+            if before is not None:
+                before_time, before_id = before
+                mask &= (self.times < before_time) | ((self.times == before_time) & (self.ids < before_id))
+            rows = np.flatnonzero(mask)[::-1]
+            if limit is not None:
+                rows = rows[:limit]
+            return self.ids[rows], self.times[rows]
+
+    def page(self, page_size, price_min=None, price_max=None, ids=None, cursor=None):
+        """
+        One keyset page of the feed as (ids, next_cursor), next_cursor being the (time datetime, id)
+        of the last row or None. Returns None when the snapshot cannot answer on its own: the page
+        may continue with posts older than the window.
+        """
+        before = (_micros(cursor[0]), cursor[1]) if cursor else None
+        if before is not None and self.window_start is not None and before[0] < self.window_start:
+            return None
+        page_ids, page_times = self.query(price_min, price_max, ids=ids, before=before, limit=page_size + 1)
+        if len(page_ids) <= page_size:
+            if self.window_start is not None:
+                return None  # Last rows of the window: older posts may follow
+            return [int(pk) for pk in page_ids], None
+        return [int(pk) for pk in page_ids[:page_size]], (_datetime(page_times[page_size - 1]), int(page_ids[page_size - 1]))
+
+
+_hot_set = None
+_hot_set_lock = threading.Lock()
+
+
+def get_hot_set(refresh=True, everything=False):
+    """
+    Return the process-wide hot set, or None when it is turned off. With everything=True, also None
+    unless it holds every post (no window). refresh=False skips reading the new posts, for writers.
+    """
+    global _hot_set
+    if not ENABLED or (everything and WINDOW_DAYS is not None):
+        return None
+    if _hot_set is None:
+        with _hot_set_lock:
+            if _hot_set is None:
+                _hot_set = HotSet()
+    if refresh:
+        _hot_set.refresh()
+    return _hot_set
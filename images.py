@@ -0,0 +1,102 @@
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .stamps import touch, POST_PICTURES
+
+# Resized WebP derivatives of uploaded images (post pictures and profile images).
+# Each variant is stored next to the original as <dir>/derivatives/<name>_<variant>.webp,
+# so the URL of a variant can be derived from the original without a lookup.
+
+IMAGE_VARIANTS = getattr(settings, 'POST_SELL_IMAGE_VARIANTS', {
+    'thumbnail': 200,  # Longest side in pixels
+    'card': 600,
+    'full': 1600,
+})
+DERIVATIVE_FORMAT = 'WEBP'
+DERIVATIVE_QUALITY = getattr(settings, 'POST_SELL_IMAGE_QUALITY', 80)
+EXISTS_CACHE_TIMEOUT = 60 * 60
+
+
+def derivative_name(name, variant):
+    """
+    Storage name of one variant of an original image.
+    """
+    directory, filename = os.path.split(name)
+    base = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'derivatives', '%s_%s.webp' % (base, variant))
+
+
+def generate_derivatives(field_file):
+    """
+    Create the missing variants of an image and return their names. Safe to run again:
+    variants already in storage are skipped. Memory stays bounded by decoding JPEGs straight
+    at the largest needed scale and shrinking each variant from the previous one.
+    """
+    storage = field_file.storage
+    missing = [variant for variant in IMAGE_VARIANTS
+               if not storage.exists(derivative_name(field_file.name, variant))]
+    if not missing:
+        return []
+
+    # Largest first, so each smaller variant is made from an already reduced image
+    missing.sort(key=lambda variant: IMAGE_VARIANTS[variant], reverse=True)
+    largest = IMAGE_VARIANTS[missing[0]]
+    created = []
+    with field_file.open('rb'), Image.open(field_file) as original:
+        original.draft('RGB', (largest, largest))  # Only has an effect on JPEG, the common upload format
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for variant in missing:
+            size = IMAGE_VARIANTS[variant]
+            image.thumbnail((size, size), Image.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY, method=4)
+            name = derivative_name(field_file.name, variant)
+            storage.save(name, ContentFile(buffer.getvalue()))
+            cache.delete(_exists_cache_key(name))
+            created.append(name)
+    return created
+
+
+def _exists_cache_key(name):
+    return 'post_sell:derivative:%s' % name
+
+
+def has_derivatives(field_file):
+    """
+    Whether the variants of an image exist. Post pictures record it on the row (variants_ready);
+    for other images (e.g. profiles) the storage check is cached so remote storages are not hit per row.
+    """
+    ready = getattr(field_file.instance, 'variants_ready', None)
+    if ready is not None:
+        return ready
+    name = derivative_name(field_file.name, next(iter(IMAGE_VARIANTS)))
+    exists = cache.get(_exists_cache_key(name))
+    if exists is None:
+        exists = field_file.storage.exists(name)
+        cache.set(_exists_cache_key(name), exists, EXISTS_CACHE_TIMEOUT)
+    return exists
+
+
+def variant_url(field_file, variant):
+    """
+    URL of a variant of the image, or of the original when the variant is unknown or not generated yet.
+    """
+    if variant in IMAGE_VARIANTS and has_derivatives(field_file):
+        return field_file.storage.url(derivative_name(field_file.name, variant))
+    return field_file.url
+
+
+def build_picture_variants(picture):
+    """
+    Generate the variants of a PostSellPictures row and mark it ready. The picture URLs of the post
+    change with it, so its picture list stamp is touched too.
+    """
+    generate_derivatives(picture.image)
+    type(picture).objects.filter(pk=picture.pk).update(variants_ready=True)
+    picture.variants_ready = True
+    touch(POST_PICTURES, picture.post_id)
@@ -0,0 +1,207 @@
+import csv
+import json
+import logging
+import os
+import time
+from django.core.files import File
+from django.db import transaction
+from .models import PostSellPictures, ImportCheckpoint
+from .serializers import PostSerializerForBatchPosting, PostPicturesSerializerForPosting
+from .posting import create_posts, resolve_posters
+
+# Bulk import of listings (e.g. a partner's catalog) from CSV or JSON Lines.
+# Rows are read as a stream and handled one chunk at a time: each chunk is validated with the
+# posting serializers, then created with create_posts (two bulk inserts in one transaction), so
+# memory stays bounded by the chunk size whatever the file size. Picture files are opened one at a
+# time, to validate them and then to copy them to storage, so open files do not grow with the chunk.
+# The number of rows done is saved in an ImportCheckpoint in the same transaction as the chunk's
+# posts; a new run with the same checkpoint name skips them, and a crash never imports a row twice.
+#
+# Columns are the PostSellForPostingView fields. poster is the poster's account id, as in
+# PostSellBatchPostingView. pictures are file paths relative to the pictures directory: a list
+# in JSON Lines, '|' separated in CSV.
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+POSTER_CACHE_SIZE = 50000  # Posters kept between chunks; the cache is emptied when it grows past this
+PICTURE_SEPARATOR = '|'
+
+
+class UnreadableRow:
+    """
+    A line of the file that could not be parsed. It is reported as an invalid row.
+    """
+
+    def __init__(self, text, error):
+        self.text = text
+        self.error = error
+
+    def __str__(self):
+        return self.text
+
+
+def _parse_line(line):
+    try:
+        row = json.loads(line)
+    except ValueError as error:
+        return UnreadableRow(line.rstrip('\n'), 'Invalid JSON: %s' % error)
+    if not isinstance(row, dict):
+        return UnreadableRow(line.rstrip('\n'), 'Expected a JSON object')
+    return row
+
+
+def read_rows(path):
+    """
+    Yield the rows of a .csv or .jsonl/.ndjson file as dicts, one at a time.
+    Lines that are not a JSON object come as UnreadableRow.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as handle:
+        if extension == '.csv':
+            for row in csv.DictReader(handle):
+                pictures = row.get('pictures') or ''
+                row['pictures'] = [name for name in pictures.split(PICTURE_SEPARATOR) if name.strip()]
+                yield row
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in handle:
+                if line.strip():
+                    yield _parse_line(line)
+        else:
+            raise ValueError('Unsupported file type %s, use .csv or .jsonl' % extension)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class PosterCache:
+    """
+    Account id -> Profile (None when there is none), filled one chunk at a time with resolve_posters.
+    """
+
+    def __init__(self, size=POSTER_CACHE_SIZE):
+        self.size = size
+        self._posters = {}
+
+    def resolve(self, user_ids):
+        missing = set(user_ids) - self._posters.keys()
+        if not missing:
+            return
+        if len(self._posters) + len(missing) > self.size:
+            self._posters.clear()
+        found = resolve_posters(missing)
+        for user_id in missing:
+            self._posters[user_id] = found.get(user_id)
+
+    def get(self, user_id):
+        return self._posters.get(user_id)
+
+
+def load_checkpoint(name):
+    """
+    Number of rows already imported under the checkpoint name (0 when there is none).
+    """
+    if not name:
+        return 0
+    return ImportCheckpoint.objects.filter(name=name).values_list('rows_done', flat=True).first() or 0
+
+
+def save_checkpoint(name, rows_done):
+    # Called inside the chunk's transaction, so it commits (or not) together with the posts
+    ImportCheckpoint.objects.update_or_create(name=name, defaults={'rows_done': rows_done})
+
+
+def _validate(row, pictures_dir):
+    # Returns ((post data, [picture paths]), None) or (None, errors). Each picture file is opened
+    # for its own validation only.
+    if isinstance(row, UnreadableRow):
+        return None, {'non_field_errors': [row.error]}
+    post_serializer = PostSerializerForBatchPosting(data=row)
+    if not post_serializer.is_valid():
+        return None, post_serializer.errors
+    paths = []
+    for name in row.get('pictures') or []:
+        path = os.path.join(pictures_dir, name)
+        if not os.path.isfile(path):
+            return None, {'pictures': ['No such file: %s' % name]}
+        with open(path, 'rb') as handle:
+            pictures_serializer = PostPicturesSerializerForPosting(data={'image': File(handle, name=os.path.basename(name))})
+            if not pictures_serializer.is_valid():
+                return None, {'pictures': [pictures_serializer.errors]}
+        paths.append(path)
+    return (post_serializer.validated_data, paths), None
+
+
+def _store_pictures(paths):
+    # Copy the picture files to storage one at a time and return their stored names, which the
+    # bulk insert then saves as they are
+    field = PostSellPictures._meta.get_field('image')
+    stored = []
+    for path in paths:
+        with open(path, 'rb') as handle:
+            name = field.generate_filename(None, os.path.basename(path))
+            stored.append({'image': field.storage.save(name, File(handle), max_length=field.max_length)})
+    return stored
+
+
+def import_listings(rows, pictures_dir='.', chunk_size=IMPORT_CHUNK_SIZE, checkpoint=None, on_error=None, on_chunk=None):
+    """
+    Validate and create posts with their pictures from an iterable of row dicts.
+    checkpoint names the ImportCheckpoint to resume from and to save progress in.
+    Invalid rows are skipped and passed to on_error(row_number, row, errors); on_chunk(stats) is
+    called after every committed chunk. Returns the stats: rows, created, invalid, seconds, rows_per_second.
+    """
+    skip = load_checkpoint(checkpoint)
+    posters = PosterCache()
+    stats = {'rows': skip, 'created': 0, 'invalid': 0, 'skipped': skip, 'seconds': 0.0, 'rows_per_second': 0.0}
+    started = time.perf_counter()
+    rows = iter(rows)
+    for _ in range(skip):
+        next(rows, None)
+
+    for chunk in _chunks(rows, chunk_size):
+        candidates = []
+        for offset, row in enumerate(chunk):
+            entry, errors = _validate(row, pictures_dir)
+            if errors:
+                stats['invalid'] += 1
+                if on_error:
+                    on_error(stats['rows'] + offset + 1, row, errors)
+                continue
+            candidates.append((stats['rows'] + offset + 1, row, entry))
+
+        posters.resolve(entry[0]['poster'] for _, _, entry in candidates)
+        entries = []
+        for row_number, row, (post_data, paths) in candidates:
+            poster = posters.get(post_data['poster'])
+            if poster is None:
+                stats['invalid'] += 1
+                if on_error:
+                    on_error(row_number, row, {'poster': ['No profile for poster %s' % post_data['poster']]})
+                continue
+            entries.append((dict(post_data, poster=poster), _store_pictures(paths)))
+
+        with transaction.atomic():
+            if entries:
+                stats['created'] += len(create_posts(entries))
+            if checkpoint:
+                save_checkpoint(checkpoint, stats['rows'] + len(chunk))
+        stats['rows'] += len(chunk)
+        stats['seconds'] = time.perf_counter() - started
+        stats['rows_per_second'] = (stats['rows'] - skip) / stats['seconds'] if stats['seconds'] else 0.0
+        if on_chunk:
+            on_chunk(stats)
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = (stats['rows'] - skip) / stats['seconds'] if stats['seconds'] else 0.0
+    logger.info('Imported %d of %d rows in %.1fs (%.1f rows/s), %d invalid', stats['created'], stats['rows'] - skip,
+                stats['seconds'], stats['rows_per_second'], stats['invalid'])
+    return stats
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from ...models import PostSell, PostSellLikes
+from ...backfill import backfill_coordinates, backfill_like_counts
+
+
+class Command(BaseCommand):
+    """
+    Fill the numeric coordinates/geohash and the like counters of existing posts.
+    """
+    help = 'Backfill lat/lng/geohash and like_count on existing posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-like-counts', action='store_true', help='Only backfill coordinates.')
+
+    def handle(self, *args, **options):
+        updated = backfill_coordinates(PostSell)
+        self.stdout.write('Coordinates filled on %d posts.' % updated)
+        if not options['skip_like_counts']:
+            backfill_like_counts(PostSell, PostSellLikes)
+            self.stdout.write('Like counts recomputed.')
+        self.stdout.write(self.style.SUCCESS('Backfill done.'))
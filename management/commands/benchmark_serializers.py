@@ -0,0 +1,18 @@
+import json
+from django.core.management.base import BaseCommand
+from ...benchmarks import benchmark_list_serializers
+
+
+class Command(BaseCommand):
+    """
+    Compare the ModelSerializer and fast list serializers on the posts in the database.
+    """
+    help = 'Benchmark PostSerializerForGet against PostListFastSerializer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Number of posts to serialize.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per serializer; the median is reported.')
+
+    def handle(self, *args, **options):
+        result = benchmark_list_serializers(options['rows'], options['repeat'])
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    """
+    EXPLAIN every hot query and fail if one of them scans a whole table.
+    """
+    help = 'Check that the hot queries of the post views use an index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan.')
+
+    def handle(self, *args, **options):
+        failures = []
+        for name, (plan, scans) in check_query_plans().items():
+            if options['verbose_plans'] or scans:
+                self.stdout.write('%s:\n%s\n' % (name, plan))
+            if scans:
+                failures.append('%s scans %s' % (name, ', '.join(scans)))
+        if failures:
+            raise CommandError('Full table scans found:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Every hot query uses an index.'))
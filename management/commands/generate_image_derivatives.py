@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from account.models import Profile
+from ...models import PostSellPictures
+from ...images import build_picture_variants, generate_derivatives
+
+
+class Command(BaseCommand):
+    """
+    Backfill the resized variants of existing post pictures (and optionally profile images).
+    Already generated variants are skipped, so the command can be stopped and run again.
+    """
+    help = 'Generate thumbnail/card/full WebP variants for existing images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', action='store_true', help='Also process profile images.')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        pictures = PostSellPictures.objects.filter(variants_ready=False).order_by('id')
+        for picture in pictures.iterator(chunk_size=500):
+            try:
+                build_picture_variants(picture)
+                done += 1
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write('Picture %s: %s' % (picture.pk, error))
+
+        if options['profiles']:
+            for profile in Profile.objects.exclude(image='').only('id', 'image').iterator(chunk_size=500):
+                try:
+                    generate_derivatives(profile.image)
+                    done += 1
+                except (OSError, ValueError) as error:
+                    failed += 1
+                    self.stderr.write('Profile %s: %s' % (profile.pk, error))
+
+        self.stdout.write(self.style.SUCCESS('Processed %d images, %d failed.' % (done, failed)))
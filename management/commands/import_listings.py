@@ -0,0 +1,47 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from ...importer import read_rows, import_listings, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Import listings and their pictures from a CSV or JSON Lines file, resumable with --checkpoint.
+    """
+    help = 'Bulk import posts (with pictures) from a .csv or .jsonl file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The .csv or .jsonl file to import.')
+        parser.add_argument('--pictures-dir', help='Directory the picture paths are relative to (default: the file\'s).')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction.')
+        parser.add_argument('--checkpoint', help='Checkpoint name; an existing one resumes after the rows it records.')
+        parser.add_argument('--errors', help='Write the invalid rows and their errors to this JSON Lines file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError('No such file: %s' % path)
+        pictures_dir = options['pictures_dir'] or os.path.dirname(os.path.abspath(path))
+        errors_file = open(options['errors'], 'a') if options['errors'] else None
+
+        def on_error(row_number, row, errors):
+            if errors_file:
+                errors_file.write(json.dumps({'row': row_number, 'data': row, 'errors': errors}, default=str) + '\n')
+
+        def on_chunk(stats):
+            self.stdout.write('%d rows, %d created, %d invalid, %.1f rows/s' % (
+                stats['rows'], stats['created'], stats['invalid'], stats['rows_per_second']))
+
+        try:
+            stats = import_listings(read_rows(path), pictures_dir, options['chunk_size'], options['checkpoint'],
+                                    on_error, on_chunk)
+        except ValueError as error:
+            raise CommandError(str(error))
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        if stats['skipped']:
+            self.stdout.write('Resumed after %d rows from the checkpoint.' % stats['skipped'])
+        self.stdout.write(self.style.SUCCESS('Created %d posts from %d rows in %.1fs (%.1f rows/s), %d invalid.' % (
+            stats['created'], stats['rows'] - stats['skipped'], stats['seconds'], stats['rows_per_second'], stats['invalid'])))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from ...models import PostSell
+from ...search_index import get_search_backend, FIELD_WEIGHTS
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the post search index from the database, e.g. after enabling a new backend.
+    On Postgres this creates the GIN index (without blocking writes); run it once on deploy.
+    """
+    help = 'Rebuild the full-text search index of posts.'
+
+    def handle(self, *args, **options):
+        posts = PostSell.objects.only('id', *FIELD_WEIGHTS).iterator(chunk_size=2000)
+        get_search_backend().rebuild(posts)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
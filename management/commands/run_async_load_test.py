@@ -0,0 +1,34 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from ...benchmarks import run_async_load_test
+
+
+class Command(BaseCommand):
+    """
+    Compare the throughput of the batch post detail and seller interest inbox views with their async
+    versions on an already seeded database (see run_benchmarks). The async versions only gain on a
+    server database with network latency; on SQLite they measure about the same or slightly slower.
+    """
+    help = 'Load test the two views with an async version against their sync originals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per view.')
+        parser.add_argument('--output', help='Also write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in (':memory:', ''):
+            raise CommandError('The async views query from worker threads; use a file or server database.')
+
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite answers in-process: expect no gain from the async views here, use a server database to measure one.'))
+        results = run_async_load_test(options['concurrency'], options['requests'])
+        for name, metrics in results.items():
+            self.stdout.write('%-24s sync %8.1f req/s  async %8.1f req/s  x%s  statuses %s' % (
+                name, metrics['sync_rps'], metrics['async_rps'], metrics['speedup'], metrics['statuses']))
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS('Results written to %s' % options['output']))
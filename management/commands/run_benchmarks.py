@@ -0,0 +1,57 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from ...benchmarks import seed_database, run_view_benchmarks, benchmark_report, compare_results, load_report
+
+
+class Command(BaseCommand):
+    """
+    Seed a local database, benchmark every view and store the results as JSON.
+    With --compare the run fails when it regressed against an earlier result file.
+    """
+    help = 'Run the view benchmark suite against a seeded local SQLite database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in the database.')
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--likes', type=int, default=250000)
+        parser.add_argument('--hides', type=int, default=250000)
+        parser.add_argument('--interests', type=int, default=50000)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed of the synthetic dataset.')
+        parser.add_argument('--iterations', type=int, default=20, help='Calls per view.')
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the results.')
+        parser.add_argument('--compare', help='Earlier result file to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed latency increase, 0.2 = 20%%.')
+        parser.add_argument('--allow-any-database', action='store_true',
+                            help='Run even if the default database is not SQLite.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' and not options['allow_any_database']:
+            raise CommandError('Benchmarks seed and write data; point DATABASES at a local SQLite file '
+                               'or pass --allow-any-database.')
+
+        volumes = None
+        if not options['skip_seed']:
+            self.stdout.write('Seeding database...')
+            volumes = seed_database(options['posts'], options['likes'], options['hides'],
+                                    options['interests'], options['users'], seed=options['seed'])
+
+        self.stdout.write('Running views...')
+        report = benchmark_report(run_view_benchmarks(options['iterations']), volumes)
+        with open(options['output'], 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+        for name, metrics in report['results'].items():
+            if 'error' in metrics:
+                self.stdout.write('%-24s %s' % (name, metrics['error']))
+            else:
+                self.stdout.write('%-24s p50 %8.2fms  p99 %8.2fms  %3d queries  %8.1fKB peak' % (
+                    name, metrics['p50_ms'], metrics['p99_ms'], metrics['queries'], metrics['peak_memory_kb']))
+        self.stdout.write(self.style.SUCCESS('Results written to %s' % options['output']))
+
+        if options['compare']:
+            regressions = compare_results(load_report(options['compare']), report, options['threshold'])
+            if regressions:
+                raise CommandError('Regressions against %s:\n%s' % (options['compare'], '\n'.join(regressions)))
+            self.stdout.write(self.style.SUCCESS('No regressions against %s' % options['compare']))
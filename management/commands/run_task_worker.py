@@ -0,0 +1,38 @@
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from ...tasks import work, CLAIM_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Run the background job worker(s): image variants, search index updates, seller notifications.
+    """
+    help = 'Process queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to run.')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--claim-size', type=int, default=CLAIM_SIZE, help='Jobs claimed (and batched) at once.')
+
+    def handle(self, *args, **options):
+        arguments = (options['once'], options['sleep'], options['claim_size'])
+        if options['processes'] <= 1:
+            work(*arguments)
+            return
+
+        # Forked children must not share the parent's connections; each opens its own
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=work, args=arguments, daemon=True) for _ in range(options['processes'])]
+        for worker in workers:
+            worker.start()
+        self.stdout.write('Started %d workers.' % len(workers))
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
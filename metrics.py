@@ -0,0 +1,198 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from .query_budget import QUERY_BUDGETS
+
+# Per-view request instrumentation.
+# ViewMetricsMiddleware records, for every view class, a latency histogram, DB query count and
+# time, render time and response size. Render time is only the JSON rendering DRF does after the
+# view returns: serializer.data built inside the view counts towards latency, not render time.
+# MetricsView exposes them in the Prometheus text format. Metrics are kept per process, like a
+# plain prometheus_client registry.
+# Add 'post.metrics.ViewMetricsMiddleware' (with this app's package name) to MIDDLEWARE.
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+SLOW_REQUEST_MS = getattr(settings, 'POST_SELL_SLOW_REQUEST_MS', None)  # None turns the slow sampler off
+SLOW_REQUEST_SAMPLE_RATE = getattr(settings, 'POST_SELL_SLOW_REQUEST_SAMPLE_RATE', 1.0)
+SLOW_REQUEST_MAX_STATEMENTS = 50
+
+
+class ViewStats:
+    """
+    Accumulated measurements of one view.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.requests = defaultdict(int)  # status code -> count
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+        self.response_bytes = 0
+        self.over_query_budget = 0
+
+    def observe(self, status, latency, queries, query_seconds, render_seconds, response_bytes, over_budget):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[index] += 1
+        self.requests[status] += 1
+        self.latency_sum += latency
+        self.queries += queries
+        self.query_seconds += query_seconds
+        self.render_seconds += render_seconds
+        self.response_bytes += response_bytes
+        self.over_query_budget += over_budget
+
+
+class MetricsRegistry:
+    """
+    Thread-safe map of view name to ViewStats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewStats)
+
+    def observe(self, view, **measurements):
+        with self._lock:
+            self._views[view].observe(**measurements)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+
+        with self._lock:
+            views = sorted(self._views.items())
+
+            family('post_sell_request_duration_seconds', 'histogram', 'Request latency per view.')
+            for view, stats in views:
+                total = sum(stats.requests.values())
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append('post_sell_request_duration_seconds_bucket{view="%s",le="%s"} %d' % (view, bound, count))
+                lines.append('post_sell_request_duration_seconds_bucket{view="%s",le="+Inf"} %d' % (view, total))
+                lines.append('post_sell_request_duration_seconds_sum{view="%s"} %f' % (view, stats.latency_sum))
+                lines.append('post_sell_request_duration_seconds_count{view="%s"} %d' % (view, total))
+
+            family('post_sell_requests_total', 'counter', 'Requests per view and status code.')
+            for view, stats in views:
+                for status, count in sorted(stats.requests.items()):
+                    lines.append('post_sell_requests_total{view="%s",status="%s"} %d' % (view, status, count))
+
+            counters = (
+                ('post_sell_db_queries_total', 'DB queries run per view.', 'queries', '%d'),
+                ('post_sell_db_query_seconds_total', 'Time spent in DB queries per view.', 'query_seconds', '%f'),
+                ('post_sell_render_seconds_total', 'Time spent rendering responses to JSON after the view returned, per view (excludes serializer.data).', 'render_seconds', '%f'),
+                ('post_sell_response_bytes_total', 'Response body bytes per view.', 'response_bytes', '%d'),
+                ('post_sell_over_query_budget_total', 'Requests that ran more queries than the view budget.', 'over_query_budget', '%d'),
+            )
+            for name, help_text, attribute, number_format in counters:
+                family(name, 'counter', help_text)
+                for view, stats in views:
+                    lines.append(('%s{view="%s"} ' + number_format) % (name, view, getattr(stats, attribute)))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting queries and their time, and keeping the SQL when asked to.
+    """
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep_sql = keep_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_sql and len(self.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+                self.statements.append((elapsed, sql))
+
+
+def _view_name(view_func):
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    if view_class is not None:
+        return view_class.__name__
+    return getattr(view_func, '__name__', 'unknown')
+
+
+class ViewMetricsMiddleware:
+    """
+    Measure every request handled by a view and record it in the registry under the view class name.
+    For streaming responses the latency is the time to the first byte and later queries are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(keep_sql=SLOW_REQUEST_MS is not None)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        latency = time.perf_counter() - started
+
+        view = getattr(request, '_metrics_view', None)
+        if view is None:
+            return response  # Not routed to a view (404, redirects by other middleware)
+
+        response_bytes = 0 if getattr(response, 'streaming', False) else len(response.content)
+        budget = QUERY_BUDGETS.get(view)
+        registry.observe(
+            view,
+            status=response.status_code,
+            latency=latency,
+            queries=recorder.count,
+            query_seconds=recorder.seconds,
+            render_seconds=getattr(request, '_metrics_render_seconds', 0.0),
+            response_bytes=response_bytes,
+            over_budget=int(budget is not None and recorder.count > budget),
+        )
+        if SLOW_REQUEST_MS is not None and latency * 1000 > SLOW_REQUEST_MS and random.random() < SLOW_REQUEST_SAMPLE_RATE:
+            logger.warning(
+                'Slow request %s %s (%s): %.1fms, %d queries in %.1fms\n%s',
+                request.method, request.get_full_path(), view, latency * 1000, recorder.count, recorder.seconds * 1000,
+                '\n'.join('%.1fms %s' % (elapsed * 1000, sql) for elapsed, sql in recorder.statements),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = _view_name(view_func)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that rendering
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_seconds = time.perf_counter() - started
+        response.add_post_render_callback(rendered)
+        return response
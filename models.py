@@ -1,7 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from account.models import Profile, Account
-from PIL import Image
+from .geo import coordinate_fields
 
 # Create your models here.
 
@@ -31,6 +31,42 @@ class PostSell(models.Model):
     condition =         models.CharField(max_length=100)  # Condition of the item (e.g. like new, good, fair)
     age =               models.IntegerField()  # Age of the item (how old the item is)
     age_unit =          models.CharField(max_length=100)  # Unit of the age (e.g., years, months)
+    lat =               models.FloatField(null=True, blank=True, editable=False)  # Numeric copy of latitude, kept in sync on save
+    lng =               models.FloatField(null=True, blank=True, editable=False)  # Numeric copy of longitude, kept in sync on save
+    geohash =           models.CharField(max_length=12, blank=True, editable=False)  # Geohash of (lat, lng) used by map viewport queries
+    like_count =        models.PositiveIntegerField(default=0, editable=False)  # Number of PostSellLikes, only changed with F() updates
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['geohash', 'lat', 'lng', 'price'], name='postsell_geo_idx'),  # Viewport lookups and clusters, covering
+            models.Index(fields=['-time', '-id'], name='postsell_time_id_idx'),  # Keyset pagination of the feed
+            models.Index(fields=['price', '-time', '-id'], name='postsell_price_time_idx'),  # Price band filters of the feed
+            models.Index(fields=['poster', '-time', '-id'], name='postsell_poster_time_idx'),  # AllPostOfOneUser
+        ]
+
+    def update_geo_fields(self):
+        """
+        Refresh the numeric coordinates and geohash from the latitude/longitude text fields.
+        Must be called explicitly before bulk_create since that skips save().
+        """
+        self.lat, self.lng, self.geohash = coordinate_fields(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.update_geo_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'lat', 'lng', 'geohash'}
+        elif update_fields is None and self._updates_existing_row(*args, **kwargs):
+            # Never write back a stale in-memory like_count over the counter maintained in the database
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'like_count']
+        super().save(*args, **kwargs)
+
+    def _updates_existing_row(self, force_insert=False, *args, **kwargs):
+        # Clones (pk set to None), forced inserts and instances whose row is gone are saved as usual
+        if self.pk is None or force_insert or self._state.adding:
+            return False
+        return type(self)._default_manager.using(kwargs.get('using') or self._state.db).filter(pk=self.pk).exists()
 
 
 
@@ -42,6 +78,7 @@ class PostSellPictures(models.Model):
     
     post =            models.ForeignKey(PostSell, on_delete=models.CASCADE)  # Post to which the picture belongs
     image =           models.ImageField(upload_to='post_sell_pics', blank=False)  # Image file of the picture
+    variants_ready =  models.BooleanField(default=False, editable=False)  # Whether the resized WebP variants were generated
 
 
 
@@ -57,6 +94,9 @@ class PostSellLikes(models.Model):
 
     class Meta:
         unique_together = ['post', 'user']  # Ensure uniqueness of post-user combination
+        indexes = [
+            models.Index(fields=['user', '-time', '-id'], name='postselllikes_user_time_idx'),  # Keyset pagination per user
+        ]
 
 
 
@@ -72,6 +112,9 @@ class PostSellDeletes(models.Model):
 
     class Meta:
         unique_together = ['post', 'user']  # Ensure uniqueness of post-user combination
+        indexes = [
+            models.Index(fields=['user', '-time', '-id'], name='postselldeletes_user_time_idx'),  # Keyset pagination per user
+        ]
 
 
 
@@ -84,6 +127,57 @@ class PostSellReceivedInterest(models.Model):
     buyer =         models.ForeignKey(Profile, on_delete=models.CASCADE)  # User who showed interest
     item =          models.ForeignKey(PostSell, on_delete=models.CASCADE)  # Post for which interest was shown
     time =          models.DateTimeField(default=timezone.now)  # Time when the interest was shown
-    # class Meta:
-    #     # Add a unique together constraint for 'buyer' and 'item'
-    #     unique_together = ('buyer', 'item')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-time', '-id'], name='postsellinterest_time_id_idx'),  # Keyset pagination of interests
+            models.Index(fields=['item', '-time'], name='postsellinterest_item_idx'),  # Interests of one post, newest first
+        ]
+        # One interest per buyer and post; its index also serves the viewer "interested" flag.
+        # Run backfill.dedupe_interests before the migration adding it.
+        unique_together = ('buyer', 'item')
+
+
+
+class BackgroundJob(models.Model):
+
+    """
+    Model representing a queued background job (see tasks.py).
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name =          models.CharField(max_length=100)  # Registered task name
+    payload =       models.JSONField(default=dict)  # Arguments of the task
+    dedupe_key =    models.CharField(max_length=200, blank=True)  # At most one pending job per non-empty key
+    status =        models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts =      models.PositiveIntegerField(default=0)  # Runs that failed so far
+    run_after =     models.DateTimeField(default=timezone.now)  # Not run before this time (retry backoff)
+    locked_until =  models.DateTimeField(null=True, blank=True)  # Lease of the worker running it
+    lease =         models.CharField(max_length=32, blank=True)  # Token of the claim that is running it
+    last_error =    models.TextField(blank=True)
+    created =       models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='backgroundjob_queue_idx'),  # Claiming due jobs
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], condition=models.Q(status='pending') & ~models.Q(dedupe_key=''),
+                                    name='backgroundjob_pending_dedupe'),
+        ]
+
+
+
+class ImportCheckpoint(models.Model):
+
+    """
+    Model representing the progress of a resumable bulk import (see importer.py).
+    """
+
+    name =          models.CharField(max_length=255, unique=True)  # Checkpoint name given to the import
+    rows_done =     models.PositiveIntegerField(default=0)  # Rows of the file imported so far, saved with each chunk
+    updated =       models.DateTimeField(auto_now=True)
@@ -0,0 +1,43 @@
+import logging
+from collections import defaultdict
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils.module_loading import import_string
+
+# Seller notifications about buyers interested in their posts.
+# Run by the notify_interest background task. POST_SELL_INTEREST_NOTIFIER can name a function
+# taking (seller profile, [interests]) to deliver them differently (push, SMS); by default the
+# seller gets one email per batch.
+
+logger = logging.getLogger(__name__)
+
+NOTIFIER = getattr(settings, 'POST_SELL_INTEREST_NOTIFIER', None)
+
+
+def email_seller(seller, interests):
+    """
+    Send the seller one email listing the new interests in their posts.
+    """
+    email = getattr(seller.user, 'email', '')
+    if not email:
+        return
+    lines = ['%s is interested in "%s"' % (interest.buyer.user.first_name, interest.item.title) for interest in interests]
+    send_mail(
+        'New interest in your posts' if len(interests) > 1 else 'New interest in "%s"' % interests[0].item.title,
+        '\n'.join(lines),
+        None,  # DEFAULT_FROM_EMAIL
+        [email],
+    )
+
+
+def notify_sellers(interests):
+    """
+    Group interests by seller and notify every seller once.
+    """
+    notify = import_string(NOTIFIER) if NOTIFIER else email_seller
+    by_seller = defaultdict(list)
+    for interest in interests:
+        by_seller[interest.item.poster_id].append(interest)
+    for seller_interests in by_seller.values():
+        notify(seller_interests[0].item.poster, seller_interests)
+    logger.info('Notified %d sellers of %d interests', len(by_seller), len(interests))
@@ -0,0 +1,131 @@
+import base64
+import json
+from django.conf import settings
+from django.db.models import Q, Case, When, IntegerField
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+
+# Keyset (cursor) pagination for the post lists.
+# Pages are ordered by (time, id) descending and the cursor holds the last row's (time, id),
+# so fetching page N costs the same as fetching page 1, unlike OFFSET.
+
+DEFAULT_PAGE_SIZE = getattr(settings, 'POST_SELL_PAGE_SIZE', 20)
+MAX_PAGE_SIZE = getattr(settings, 'POST_SELL_MAX_PAGE_SIZE', 100)
+
+
+def wants_pagination(params):
+    """
+    Pagination is opt-in so existing clients keep receiving the plain list.
+    """
+    return 'cursor' in params or 'page_size' in params
+
+
+def encode_cursor(time_value, pk):
+    """
+    Encode the (time, id) of the last row on a page into an opaque cursor.
+    """
+    raw = json.dumps([time_value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor. Raises ValueError when it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        time_text, pk = json.loads(raw)
+        time_value = parse_datetime(time_text)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if time_value is None or not isinstance(pk, int):
+        raise ValueError('Invalid cursor')
+    return time_value, pk
+
+
+def get_page_size(params):
+    """
+    Read page_size from the query params, clamped to [1, MAX_PAGE_SIZE].
+    """
+    try:
+        page_size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid page size')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def _value(row, name):
+    # Rows are model instances, or dicts for serializers that read .values() (see prepare())
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _prepare(queryset, serializer_class):
+    prepare = getattr(serializer_class, 'prepare', None)
+    return prepare(queryset) if prepare else queryset
+
+
+def paginate_keyset(queryset, params, field='time'):
+    """
+    Return (page, next_cursor) for the queryset ordered by (field, id) descending.
+    next_cursor is None on the last page. Raises ValueError on a bad cursor or page size.
+    """
+    page_size = get_page_size(params)
+    queryset = queryset.order_by('-' + field, '-id')
+    cursor = params.get('cursor')
+    if cursor:
+        time_value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{field + '__lt': time_value}) | Q(**{field: time_value, 'id__lt': pk}))
+
+    # Fetch one extra row to know whether there is a next page without a COUNT query
+    page = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(_value(page[-1], field), _value(page[-1], 'id'))
+    return page, next_cursor
+
+
+def paginated_response(queryset, serializer_class, request, field='time'):
+    """
+    Serialize one keyset page of the queryset as {'results': [...], 'next': cursor}.
+    """
+    try:
+        page, next_cursor = paginate_keyset(_prepare(queryset, serializer_class), request.GET, field)
+    except ValueError as error:
+        return Response(str(error), status=400)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return Response({'results': serializer.data, 'next': next_cursor}, status=200)
+
+
+def order_by_rank(queryset, ranked_ids):
+    """
+    Order the queryset by the position of each row's id in ranked_ids (e.g. search relevance).
+    """
+    rank = Case(*[When(id=pk, then=position) for position, pk in enumerate(ranked_ids)], output_field=IntegerField())
+    return queryset.filter(id__in=ranked_ids).order_by(rank)
+
+
+def ranked_paginated_response(queryset, ranked_ids, serializer_class, request):
+    """
+    Serialize one page of a relevance-ordered result. The ranked id list is already capped by the
+    search backend, so the cursor can simply hold the offset into it.
+    """
+    try:
+        page_size = get_page_size(request.GET)
+        offset = 0
+        if request.GET.get('cursor'):
+            cursor = request.GET['cursor']
+            offset = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))['offset']
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError
+    except (TypeError, KeyError, ValueError):
+        return Response('Invalid cursor', status=400)
+
+    page = list(order_by_rank(_prepare(queryset, serializer_class), ranked_ids)[offset:offset + page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        raw = json.dumps({'offset': offset + page_size}).encode()
+        next_cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return Response({'results': serializer.data, 'next': next_cursor}, status=200)
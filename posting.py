@@ -0,0 +1,64 @@
+import logging
+import time
+from django.db import transaction
+from account.models import Profile
+from .models import PostSell, PostSellPictures
+from .tasks import schedule_search_sync, schedule_picture_variants
+from .response_cache import bump_generation
+from .stamps import touch, PROFILE_POSTS, POST_PICTURES
+from .recommendations import get_recommendation_index
+
+# Bulk creation of posts and their pictures.
+# bulk_create skips save() and model signals, so everything the signals would have done
+# for a single post (geo fields, search and recommendation indexes, cache invalidation, stamps, image variants)
+# is done or queued here explicitly.
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_posters(user_ids):
+    """
+    Map account ids to their Profile in one query.
+    """
+    return {profile.user_id: profile for profile in Profile.objects.filter(user__in=set(user_ids))}
+
+
+def create_post_pictures(posts_and_pictures):
+    """
+    Insert the pictures of already saved posts with one bulk_create.
+    posts_and_pictures is an iterable of (post, [validated picture data]).
+    """
+    pictures = [PostSellPictures(post=post, **picture) for post, post_pictures in posts_and_pictures for picture in post_pictures]
+    if not pictures:
+        return []
+    pictures = PostSellPictures.objects.bulk_create(pictures)
+    post_ids = {picture.post_id for picture in pictures}
+    transaction.on_commit(lambda: [touch(POST_PICTURES, post_id) for post_id in post_ids])
+    schedule_picture_variants(pictures)
+    return pictures
+
+
+def create_posts(entries):
+    """
+    Create posts and their pictures in a single transaction with two bulk inserts.
+    entries is a list of (validated post data including poster, [validated picture data]).
+    Returns the created posts.
+    """
+    posts = []
+    for post_data, _ in entries:
+        post = PostSell(**post_data)
+        post.update_geo_fields()
+        posts.append(post)
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        posts = PostSell.objects.bulk_create(posts)
+        create_post_pictures(zip(posts, (pictures for _, pictures in entries)))
+        schedule_search_sync(post.pk for post in posts)
+        transaction.on_commit(lambda: get_recommendation_index().add_posts(posts))
+        transaction.on_commit(bump_generation)
+        poster_ids = {post.poster_id for post in posts}
+        transaction.on_commit(lambda: [touch(PROFILE_POSTS, poster_id) for poster_id in poster_ids])
+    elapsed = time.perf_counter() - started
+    logger.info('Created %d posts in %.3fs (%.1f posts/s)', len(posts), elapsed, len(posts) / elapsed if elapsed else 0.0)
+    return posts
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.test.utils import CaptureQueriesContext
+
+# Query budgets for the list and detail endpoints.
+# Each read view must answer in a fixed number of queries, whatever the number of rows.
+# Tests wrap a view call in query_budget() (or call check_view_query_budget) so an N+1
+# regression fails loudly instead of slowly. Counts exclude authentication lookups, so
+# call the view with force_authenticate or an anonymous request.
+
+QUERY_BUDGETS = {
+    'SearchPostSellsForViewing': 3,  # Search index lookup + posts with poster cards (+ facet counts with facets=1)
+    'SearchPostSellsForViewingOnMap': 2,  # Search index lookup + posts (or clusters)
+    'AllPostOfOneUser': 2,  # Profile + posts
+    'PostsSellDetailedView': 1,
+    'PostsSellBatchDetailView': 2,  # Posts with poster cards and viewer flags + pictures
+    'SimilarPostsView': 3,  # New posts for the index (every few seconds) + hidden posts (cold cache) + posts with poster cards
+    'PostPicturesSerilizerforViewingView': 1,
+    'GetLikedPostsPerUserPerPostView': 1,
+    'GetLikedPostsPerUserView': 1,
+    'PostViewerStateView': 1,
+    'GetDeletedPostsPerUserPerPostView': 1,
+    'GetDeletedPostsPerUserView': 1,
+    'GetReceivedInterestPerUserPerPostView': 2,  # Interests with item and buyer + item pictures
+    'GetReceivedInterestPerUserView': 2,
+    'SellerInterestInboxView': 3,  # Posts with counts and poster cards + pictures + latest buyers
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a block runs more queries than its budget allows.
+    """
+
+
+@contextmanager
+def query_budget(name, budget=None, using=DEFAULT_DB_ALIAS):
+    """
+    Fail with QueryBudgetExceeded if the block runs more queries than QUERY_BUDGETS[name] (or budget).
+    """
+    if budget is None:
+        budget = QUERY_BUDGETS[name]
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > budget:
+        statements = '\n'.join(query['sql'] for query in context.captured_queries)
+        raise QueryBudgetExceeded(
+            '%s ran %d queries, budget is %d:\n%s' % (name, len(context), budget, statements)
+        )
+
+
+def check_view_query_budget(view_class, request, **kwargs):
+    """
+    Call a view inside its query budget and return the rendered response.
+    """
+    with query_budget(view_class.__name__):
+        response = view_class.as_view()(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    return response
@@ -0,0 +1,51 @@
+import re
+from django.db import connection
+from .models import PostSell, PostSellLikes, PostSellDeletes, PostSellReceivedInterest
+from .geo import viewport_q
+
+# EXPLAIN checks for the hot queries of the views.
+# Each query is built the way its view builds it and must be answered from an index:
+# a plan with a full table scan (SQLite "SCAN table" without an index, Postgres "Seq Scan")
+# fails the check. Run it with the check_query_plans command after schema changes.
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b)(?!CONSTANT ROW)(\S+)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\S+)')
+
+
+def hot_queries():
+    """
+    Name -> queryset for every hot query, with representative parameters.
+    """
+    page = 21  # Page size + 1, as paginate_keyset fetches it
+    return {
+        'feed': PostSell.objects.order_by('-time', '-id')[:page],
+        'feed_price_band': PostSell.objects.filter(price__range=(20, 80)).order_by('-time', '-id')[:page],
+        'posts_of_user': PostSell.objects.filter(poster=1).order_by('-time', '-id')[:page],
+        'map_viewport': PostSell.objects.filter(viewport_q(43.60, -79.45, 43.70, -79.30)).values('id', 'lat', 'lng', 'price'),
+        'likes_of_user': PostSellLikes.objects.filter(user=1).order_by('-time', '-id')[:page],
+        'like_lookup': PostSellLikes.objects.filter(user=1, post=1),
+        'hides_of_user': PostSellDeletes.objects.filter(user=1).order_by('-time', '-id')[:page],
+        'hidden_set': PostSellDeletes.objects.filter(user=1).values_list('post_id', flat=True),
+        'hide_lookup': PostSellDeletes.objects.filter(user=1, post=1),
+        'interests_of_item': PostSellReceivedInterest.objects.filter(item=1).order_by('-time'),
+        'interest_lookup': PostSellReceivedInterest.objects.filter(buyer=1, item=1),
+    }
+
+
+def full_scans(plan):
+    """
+    Tables read with a full scan in an EXPLAIN output.
+    """
+    pattern = POSTGRES_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+    return pattern.findall(plan)
+
+
+def check_query_plans():
+    """
+    Return {name: (plan, [fully scanned tables])} for every hot query.
+    """
+    results = {}
+    for name, queryset in hot_queries().items():
+        plan = queryset.explain()
+        results[name] = (plan, full_scans(plan))
+    return results
@@ -0,0 +1,276 @@
+import math
+import threading
+import time
+import zlib
+import numpy as np
+from django.conf import settings
+from .geo import parse_coordinate
+from .search_index import tokenize
+from .hidden_posts import get_hidden_post_ids
+
+# "Similar items nearby" recommendations.
+# Every post is turned into a fixed-length feature vector (location, price, condition, age and
+# hashed title tokens) and kept in a NumPy matrix, one row per post. A query is a single
+# vectorized distance computation against all rows, so it takes milliseconds without touching
+# the database. The matrix lives in the process, like InMemorySearchBackend: it is loaded on
+# first use, updated by the post signals and picks up posts created by other processes with a
+# cheap "id > last seen id" query every REFRESH_INTERVAL seconds. Edits and deletes made by other
+# processes (other web workers, the importer, the task worker) are picked up by a full reload every
+# FULL_RELOAD_INTERVAL seconds, built beside the live matrix and swapped in. Hidden posts are read
+# from the per-user hidden cache at query time.
+
+TITLE_DIMENSIONS = 64  # Buckets of the hashed title tokens
+DEFAULT_NEIGHBOURS = 10
+MAX_NEIGHBOURS = 50
+REFRESH_INTERVAL = getattr(settings, 'POST_SELL_RECOMMENDATION_REFRESH', 30)  # Seconds
+FULL_RELOAD_INTERVAL = getattr(settings, 'POST_SELL_RECOMMENDATION_RELOAD', 600)  # Seconds
+FEATURE_WEIGHTS = getattr(settings, 'POST_SELL_RECOMMENDATION_WEIGHTS', {
+    'location': 4.0,  # Applied to the chord between two points on the unit sphere (~ distance / earth radius)
+    'price': 1.0,  # Applied to log(1 + price)
+    'condition': 0.5,
+    'age': 0.5,  # Applied to log(1 + age in years)
+    'title': 2.0,  # Applied to the L2-normalized hashed title tokens
+})
+CONDITION_RANKS = {'new': 0, 'like new': 1, 'excellent': 1, 'good': 2, 'fair': 3, 'used': 3, 'poor': 4, 'for parts': 4}
+AGE_UNIT_YEARS = {'day': 1 / 365, 'week': 1 / 52, 'month': 1 / 12, 'year': 1}
+FEATURE_COLUMNS = ('id', 'latitude', 'longitude', 'price', 'condition', 'age', 'age_unit', 'title')
+DIMENSIONS = 3 + 1 + 1 + 1 + TITLE_DIMENSIONS
+
+
+def _age_in_years(age, unit):
+    unit = (unit or '').strip().casefold().rstrip('s')
+    return max(age or 0, 0) * AGE_UNIT_YEARS.get(unit, 1)
+
+
+def post_features(post):
+    """
+    Feature vector of a post, given as a model instance or a dict of FEATURE_COLUMNS.
+    Posts without valid coordinates get a zero location, which keeps them away from every real place.
+    """
+    value = post.get if isinstance(post, dict) else lambda name: getattr(post, name)
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+
+    lat = parse_coordinate(value('latitude'), 90)
+    lng = parse_coordinate(value('longitude'), 180)
+    if lat is not None and lng is not None:
+        lat, lng = math.radians(lat), math.radians(lng)
+        vector[0:3] = (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+        vector[0:3] *= FEATURE_WEIGHTS['location']
+
+    vector[3] = math.log1p(max(value('price') or 0, 0)) * FEATURE_WEIGHTS['price']
+    rank = CONDITION_RANKS.get((value('condition') or '').strip().casefold(), 2)
+    vector[4] = rank / 4 * FEATURE_WEIGHTS['condition']
+    vector[5] = math.log1p(_age_in_years(value('age'), value('age_unit'))) * FEATURE_WEIGHTS['age']
+
+    title = vector[6:]
+    for token in tokenize(value('title')):
+        title[zlib.crc32(token.encode()) % TITLE_DIMENSIONS] += 1.0
+    norm = np.linalg.norm(title)
+    if norm:
+        title *= FEATURE_WEIGHTS['title'] / norm
+    return vector
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RecommendationIndex:
+    """
+    Feature matrix of the posts with k-nearest-neighbour lookups.
+    Rows are appended as posts come in; removed posts are only masked out until the next compaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # One refresh or reload at a time
+        self._reset()
+
+    def _reset(self):
+        self._loaded = False
+        self._refreshed = 0.0
+        self._reloaded = 0.0
+        self._reloading = None  # Changes made by signals while a reload runs, replayed on its result
+        self._last_id = 0
+        self._matrix = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._active = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._rows = {}  # post id -> row
+
+    def _grow(self, needed):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        matrix = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        active = np.zeros(capacity, dtype=bool)
+        active[:self._size] = self._active[:self._size]
+        self._matrix, self._ids, self._active = matrix, ids, active
+
+    def _set(self, post_id, vector):
+        row = self._rows.get(post_id)
+        if row is None:
+            self._grow(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._rows[post_id] = row
+            self._ids[row] = post_id
+        self._matrix[row] = vector
+        self._active[row] = True
+
+    def add_posts(self, posts):
+        """
+        Add or refresh posts (model instances or dicts of FEATURE_COLUMNS). Before the first load
+        there is nothing to update: the load reads them from the database.
+        """
+        if not self._loaded:
+            return
+        self._add(posts)
+
+    def _add(self, posts):
+        vectors = [(post['id'] if isinstance(post, dict) else post.pk, post_features(post)) for post in posts]
+        with self._lock:
+            for post_id, vector in vectors:
+                self._set(post_id, vector)
+            if self._reloading is not None:
+                self._reloading.append(('add', vectors))
+
+    def remove_post(self, post_id):
+        """
+        Stop recommending a post. The matrix is compacted once half of its rows are removed.
+        """
+        with self._lock:
+            if self._reloading is not None:
+                self._reloading.append(('remove', post_id))
+            self._remove(post_id)
+
+    def _remove(self, post_id):
+        row = self._rows.pop(post_id, None)
+        if row is None:
+            return
+        self._active[row] = False
+        if len(self._rows) * 2 < self._size:
+            self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self._active[:self._size])
+        self._matrix = self._matrix[keep].copy()
+        self._ids = self._ids[keep].copy()
+        self._active = np.ones(len(keep), dtype=bool)
+        self._size = len(keep)
+        self._rows = {int(post_id): row for row, post_id in enumerate(self._ids)}
+
+    def _read_new_posts(self):
+        from .models import PostSell
+        rows = PostSell.objects.filter(id__gt=self._last_id).order_by('id').values(*FEATURE_COLUMNS)
+        for chunk in _chunks(rows.iterator(chunk_size=2000), 2000):
+            self._add(chunk)
+            # Only ids read here move the watermark: posts added by signals may be newer than
+            # posts other processes created and this one has not seen yet
+            self._last_id = max(self._last_id, chunk[-1]['id'])
+
+    def refresh(self, force=False):
+        """
+        Load the whole table on first use, then only the posts created since the last seen id,
+        and everything again (swapped in when ready) every FULL_RELOAD_INTERVAL seconds.
+        While another thread refreshes, queries use the current matrix instead of waiting.
+        """
+        now = time.monotonic()
+        if not force and self._loaded and now - self._refreshed < REFRESH_INTERVAL:
+            return
+        if not self._refresh_lock.acquire(blocking=not self._loaded or force):
+            return
+        try:
+            if self._loaded and (force or now - self._reloaded >= FULL_RELOAD_INTERVAL):
+                self._reload()
+            else:
+                self._read_new_posts()
+                if not self._loaded:
+                    self._reloaded = now
+                self._loaded = True
+            self._refreshed = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _reload(self):
+        # Build a fresh matrix while queries keep using this one, then take its state over.
+        # Changes the signals made in the meantime are replayed on it, since the fresh read may
+        # predate them.
+        with self._lock:
+            self._reloading = []
+        fresh = RecommendationIndex()
+        try:
+            fresh._read_new_posts()
+        except Exception:
+            with self._lock:
+                self._reloading = None
+            raise
+        with self._lock:
+            for change, value in self._reloading:
+                if change == 'add':
+                    for post_id, vector in value:
+                        fresh._set(post_id, vector)
+                else:
+                    fresh._remove(value)
+            self._matrix, self._ids, self._active = fresh._matrix, fresh._ids, fresh._active
+            self._size, self._rows, self._last_id = fresh._size, fresh._rows, fresh._last_id
+            self._reloading = None
+            self._reloaded = time.monotonic()
+
+    def rebuild(self):
+        """
+        Reload everything from the database.
+        """
+        self.refresh(force=True)
+
+    def similar(self, post_id, k=DEFAULT_NEIGHBOURS, user_id=None):
+        """
+        Ids of the k posts closest to post_id, closest first, leaving out the post itself and the
+        posts the user hid. Returns [] for an unknown post.
+        """
+        self.refresh()
+        hidden = np.frombuffer(get_hidden_post_ids(user_id), dtype=np.int64) if user_id else None
+        with self._lock:
+            row = self._rows.get(post_id)
+            if row is None:
+                return []
+            matrix = self._matrix[:self._size]
+            distances = np.einsum('ij,ij->i', matrix - matrix[row], matrix - matrix[row])
+            excluded = ~self._active[:self._size]
+            excluded[row] = True
+            if hidden is not None and len(hidden):
+                excluded |= np.isin(self._ids[:self._size], hidden, assume_unique=True)
+            distances[excluded] = np.inf
+            candidates = min(k, int((~excluded).sum()))
+            if candidates <= 0:
+                return []
+            nearest = np.argpartition(distances, candidates - 1)[:candidates]
+            nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+            return [int(post_id) for post_id in self._ids[nearest]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_recommendation_index():
+    """
+    Return the process-wide recommendation index.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = RecommendationIndex()
+    return _index
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from .search_index import tokenize
+
+# Shared response cache for the search and map endpoints.
+# Entries are keyed on the normalized query params (never the user) plus a generation counter.
+# Creating, editing or deleting a post, and liking or unliking one (the posts carry like_count),
+# bumps the generation, which makes every older entry unreachable at once; they then simply
+# expire. Per-user filtering (hidden posts) is applied by the views after the cache, so one
+# entry serves every user.
+
+CACHE_TIMEOUT = getattr(settings, 'POST_SELL_SEARCH_CACHE_TIMEOUT', 60)
+LOCK_TIMEOUT = 10  # Seconds a rebuild may hold the lock
+LOCK_WAIT = 2.0  # Seconds other requests wait for that rebuild before computing themselves
+GENERATION_KEY = 'post_sell:search:generation'
+
+TEXT_PARAMS = ('q',)
+NUMBER_PARAMS = ('price_min', 'price_max', 'zoom', 'page_size')
+COORDINATE_PARAMS = ('south', 'west', 'north', 'east', 'lat', 'lng', 'radius')
+RAW_PARAMS = ('clustered', 'cursor', 'sort', 'image_size', 'time_format', 'facets')
+
+
+def get_generation():
+    """
+    Current generation of the search data. Starts from the clock so a flushed cache never reuses old keys.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """
+    Invalidate every cached search response. Called when posts are created, edited, deleted, liked or unliked.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+
+
+def normalize_params(params):
+    """
+    Reduce the query params to a canonical dict so equivalent requests share one entry.
+    Coordinates are rounded to ~10m so small map jitters hit the same entry.
+    """
+    normalized = {}
+    for name in TEXT_PARAMS:
+        if params.get(name):
+            normalized[name] = ' '.join(tokenize(params[name]))
+    for name in NUMBER_PARAMS + COORDINATE_PARAMS:
+        value = params.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            number = float(value)
+        except ValueError:
+            normalized[name] = value  # Left as is, the view will reject it
+            continue
+        normalized[name] = round(number, 4) if name in COORDINATE_PARAMS else number
+    for name in RAW_PARAMS:
+        if params.get(name):
+            normalized[name] = params[name]
+    return normalized
+
+
+def cache_key(name, request):
+    """
+    Cache key of a request to the endpoint called name. The host is part of it because
+    serialized image URLs are absolute.
+    """
+    params = normalize_params(request.GET)
+    digest = hashlib.sha1(json.dumps([request.get_host(), params], sort_keys=True).encode()).hexdigest()
+    return 'post_sell:search:%s:%s:%s' % (name, get_generation(), digest)
+
+
+def _plain(data):
+    # Serializer results (ReturnList/ReturnDict) keep a reference to their serializer; store plain copies
+    if isinstance(data, list):
+        return [_plain(item) for item in data]
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    return data
+
+
+def cached_response(name, request, compute):
+    """
+    Return the cached response for the request, or build it with compute(request) and cache it when
+    it is a 200. Only one request rebuilds a missing entry; the others wait for it up to LOCK_WAIT
+    seconds instead of all hitting the database at once.
+    """
+    key = cache_key(name, request)
+    data = cache.get(key)
+    if data is not None:
+        return Response(data, status=200)
+
+    lock_key = key + ':lock'
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data, status=200)
+        return compute(request)
+
+    try:
+        response = compute(request)
+        if response.status_code == 200:
+            response.data = _plain(response.data)
+            cache.set(key, response.data, CACHE_TIMEOUT)
+        return response
+    finally:
+        cache.delete(lock_key)
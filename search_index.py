@@ -0,0 +1,298 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# Full-text search over posts.
+# The views only talk to get_search_backend(); the backend keeps an inverted index of
+# title/description/size and returns post ids ranked by relevance. The last query term
+# is matched as a prefix so type-ahead works while the user is still typing.
+# search() returns ranked ids capped at MAX_RESULTS and is only meant for relevance ordering;
+# filter() restricts a queryset to every match, for the time-ordered feed and the map.
+
+TOKEN_RE = re.compile(r'\w+')
+FIELD_WEIGHTS = {'title': 3.0, 'description': 1.0, 'size': 1.0}  # Matches in the title rank higher
+MAX_RESULTS = getattr(settings, 'POST_SELL_SEARCH_MAX_RESULTS', 1000)
+
+
+def tokenize(text):
+    """
+    Split text into lower-cased word tokens.
+    """
+    return TOKEN_RE.findall((text or '').casefold())
+
+
+class BaseSearchBackend:
+    """
+    Interface every search backend implements.
+    """
+
+    def index_post(self, post):
+        """
+        Add or refresh one post in the index.
+        """
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        """
+        Drop one post from the index.
+        """
+        raise NotImplementedError
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Return up to limit post ids matching every term of the query, best match first.
+        """
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """
+        Restrict a PostSell queryset to every post matching the query, without the relevance cap.
+        """
+        return queryset.filter(id__in=self.search(query, limit=None))
+
+    def needs_sync(self):
+        """
+        Whether posts have to be passed to index_post/remove_post when they change.
+        """
+        return True
+
+    def rebuild(self, posts):
+        """
+        Rebuild the whole index from an iterable of posts.
+        """
+        for post in posts:
+            self.index_post(post)
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Pure-Python inverted index. Used in tests and single-process setups; every process keeps its own copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._postings = defaultdict(dict)  # token -> {post_id: weighted term frequency}
+        self._tokens = []  # Sorted vocabulary, for prefix lookups
+        self._documents = {}  # post_id -> tokens, so a post can be removed or re-indexed
+
+    def index_post(self, post):
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(post, field)):
+                weights[token] += weight
+        with self._lock:
+            self._remove(post.pk)
+            for token, weight in weights.items():
+                if token not in self._postings:
+                    bisect.insort(self._tokens, token)
+                self._postings[token][post.pk] = weight
+            self._documents[post.pk] = tuple(weights)
+
+    def remove_post(self, post_id):
+        with self._lock:
+            self._remove(post_id)
+
+    def _remove(self, post_id):
+        for token in self._documents.pop(post_id, ()):
+            postings = self._postings[token]
+            postings.pop(post_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    def _prefix_postings(self, prefix):
+        merged = {}
+        start = bisect.bisect_left(self._tokens, prefix)
+        for token in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            for post_id, weight in self._postings[token].items():
+                merged[post_id] = max(weight, merged.get(post_id, 0.0))
+        return merged
+
+    def rebuild(self, posts):
+        super().rebuild(posts)
+        self._loaded = True
+
+    def _load(self):
+        # A fresh process starts empty; fill it from the database on first use
+        from .models import PostSell
+        self.rebuild(PostSell.objects.only('id', *FIELD_WEIGHTS).iterator(chunk_size=2000))
+
+    def search(self, query, limit=MAX_RESULTS):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        if not self._loaded:
+            self._load()
+        with self._lock:
+            total = len(self._documents) or 1
+            scores = None
+            for position, term in enumerate(terms):
+                if position == len(terms) - 1:
+                    postings = self._prefix_postings(term)
+                else:
+                    postings = dict(self._postings.get(term, {}))
+                if not postings:
+                    return []
+                idf = math.log(1 + total / len(postings))
+                if scores is None:
+                    scores = {post_id: weight * idf for post_id, weight in postings.items()}
+                else:
+                    scores = {post_id: score + postings[post_id] * idf
+                              for post_id, score in scores.items() if post_id in postings}
+        # Newer posts (higher id) win ties
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [post_id for post_id, score in (ranked if limit is None else ranked[:limit])]
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 virtual table keyed by post id, ranked with bm25().
+    """
+
+    table = 'postsell_fts'
+
+    def __init__(self):
+        self._ready = False
+
+    def _ensure_table(self, cursor):
+        if not self._ready:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(title, description, size, tokenize="unicode61")' % self.table
+            )
+            self._ready = True
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            self._ensure_table(cursor)
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % self.table, [post.pk])
+            cursor.execute(
+                'INSERT INTO %s (rowid, title, description, size) VALUES (%%s, %%s, %%s, %%s)' % self.table,
+                [post.pk, post.title, post.description, post.size],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            self._ensure_table(cursor)
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % self.table, [post_id])
+
+    @staticmethod
+    def _match(terms):
+        # Tokens are plain words, so quoting them is enough to keep FTS5 operators out
+        return ' '.join('"%s"' % term for term in terms) + '*'
+
+    def search(self, query, limit=MAX_RESULTS):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = self._match(terms)
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        with connection.cursor() as cursor:
+            self._ensure_table(cursor)
+            cursor.execute(
+                'SELECT rowid FROM %s WHERE %s MATCH %%s ORDER BY bm25(%s, %s), rowid DESC LIMIT %%s'
+                % (self.table, self.table, self.table, weights),
+                [match, -1 if limit is None else limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        with connection.cursor() as cursor:
+            self._ensure_table(cursor)
+        matches = RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s' % (self.table, self.table), [self._match(terms)])
+        return queryset.filter(id__in=matches)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Postgres tsvector search on an expression GIN index. Postgres keeps the index up to date on write,
+    so index_post/remove_post have nothing to do. The index is created by rebuild_search_index
+    (CONCURRENTLY, so writes go on while it builds), never from a request.
+    """
+
+    index_name = 'postsell_search_gin_idx'
+    document = (
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(size, '')), 'B')"
+    )
+
+    def _table(self):
+        from .models import PostSell
+        return PostSell._meta.db_table
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def needs_sync(self):
+        return False
+
+    def rebuild(self, posts):
+        # CONCURRENTLY cannot run inside a transaction block (e.g. a test case)
+        concurrently = '' if connection.in_atomic_block else 'CONCURRENTLY '
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE INDEX %sIF NOT EXISTS %s ON %s USING GIN ((%s))'
+                           % (concurrently, self.index_name, self._table(), self.document))
+
+    def search(self, query, limit=MAX_RESULTS):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        ts_query = ' & '.join(terms) + ':*'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM %s WHERE (%s) @@ to_tsquery('simple', %%s) "
+                "ORDER BY ts_rank((%s), to_tsquery('simple', %%s)) DESC, id DESC LIMIT %%s"
+                % (self._table(), self.document, self.document),
+                [ts_query, ts_query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        ts_query = ' & '.join(terms) + ':*'
+        # Same expression as the index, so the planner can use it
+        matches = RawSQL("SELECT id FROM %s WHERE (%s) @@ to_tsquery('simple', %%s)"
+                         % (self._table(), self.document), [ts_query])
+        return queryset.filter(id__in=matches)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """
+    Return the process-wide search backend. POST_SELL_SEARCH_BACKEND can name a backend class;
+    otherwise it is picked from the database vendor.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'POST_SELL_SEARCH_BACKEND', None)
+                if path:
+                    backend_class = import_string(path)
+                elif connection.vendor == 'postgresql':
+                    backend_class = PostgresSearchBackend
+                elif connection.vendor == 'sqlite':
+                    backend_class = SqliteSearchBackend
+                else:
+                    backend_class = InMemorySearchBackend
+                _backend = backend_class()
+    return _backend
@@ -1,18 +1,53 @@
+from datetime import timedelta
 from .models import PostSell, PostSellPictures, PostSellLikes, PostSellDeletes, PostSellReceivedInterest
 from rest_framework import serializers
+from django.db import models
+from django.db.models import Prefetch
+from django.utils import timezone
 from account.models import Profile, Account
 from django.contrib.humanize.templatetags.humanize import naturaltime
 from rest_framework.fields import CurrentUserDefault
 from rest_framework.reverse import reverse
+from .images import variant_url
 
 # Serializers for API views
 
+class VariantImageField(serializers.ImageField):
+    """
+    Image field that returns a resized variant when the request asks for one with ?image_size=thumbnail|card|full.
+    Without image_size it returns the original, as before.
+    """
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variant = request.GET.get('image_size') if request is not None else None
+        if not value or not variant:
+            return super().to_representation(value)
+        url = variant_url(value, variant)
+        return request.build_absolute_uri(url)
+
+
+class StoredOrUploadedImageField(serializers.ImageField):
+    """
+    Image field that accepts either an uploaded image or the name of an image already in storage,
+    as the posting endpoints always have for JSON requests.
+    """
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        if not data.strip():
+            self.fail('empty')
+        if self.max_length is not None and len(data) > self.max_length:
+            self.fail('max_length', max_length=self.max_length, length=len(data))
+        return data
+
+
 class ProfileSerializerForShowPost(serializers.HyperlinkedModelSerializer):
     """
     Serializer for Profile model used in displaying posts, when we need a list of all posts. 
     This is to reduce the data size and only retrieve the profile data we need to show posts in a list.
     """
     first_name = serializers.CharField(source='user.first_name')
+    image = VariantImageField(read_only=True)
     
     class Meta:
         model = Profile
@@ -26,6 +61,13 @@ class PostSerializerForGet(serializers.ModelSerializer):
     profile_obj = Profile.objects.all()
     poster = ProfileSerializerForShowPost(profile_obj)
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the poster card with the posts so a list costs one query instead of one per post.
+        """
+        return queryset.select_related('poster__user')
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         representation['time'] = naturaltime(instance.time)
@@ -36,6 +78,113 @@ class PostSerializerForGet(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class PostListFastSerializer:
+    """
+    Fast path for long post lists with the same JSON shape as PostSerializerForGet.
+    Rows are read with .values() and turned into dicts by converters prepared once per class,
+    skipping the ModelSerializer field machinery. Use prepare() on the queryset first.
+    The time format comes from ?time_format=natural|iso|epoch (natural by default, as before);
+    naturaltime is computed against one "now" per request and reused for equal ages.
+    """
+    poster_columns = ('poster__user__first_name', 'poster__image')
+    _converters = None
+
+    def __init__(self, instance, many=True, context=None):
+        self.instance = instance
+        self.context = context or {}
+
+    @classmethod
+    def columns(cls):
+        """
+        Post columns, in the order PostSerializerForGet outputs them, followed by the poster card columns.
+        """
+        fields = [field for field in PostSell._meta.concrete_fields if not field.primary_key]
+        return ('id',) + tuple(field.attname for field in fields) + cls.poster_columns
+
+    @classmethod
+    def converters(cls):
+        """
+        (output name, column, converter or None) for every post field, built once.
+        """
+        if cls._converters is None:
+            converters = [('id', 'id', None)]
+            for field in PostSell._meta.concrete_fields:
+                if field.primary_key:
+                    continue
+                if field.name == 'poster':
+                    converters.append(('poster', 'poster_id', None))  # Replaced by the poster card
+                elif isinstance(field, models.DateTimeField):
+                    converters.append((field.name, field.attname, 'time'))
+                else:
+                    converters.append((field.name, field.attname, None))
+            cls._converters = converters
+        return cls._converters
+
+    @classmethod
+    def prepare(cls, queryset):
+        """
+        Turn a PostSell queryset into the .values() rows this serializer reads.
+        """
+        return queryset.values(*cls.columns())
+
+    def _time_converter(self):
+        time_format = 'natural'
+        request = self.context.get('request')
+        if request is not None:
+            time_format = request.GET.get('time_format', 'natural')
+        if time_format == 'epoch':
+            return lambda value: value.timestamp()
+        if time_format == 'iso':
+            return lambda value: serializers.DateTimeField().to_representation(value)
+
+        now = timezone.now()
+        memo = {}
+
+        def natural(value):
+            # naturaltime only depends on the age, at second/minute/hour resolution
+            age = int((now - value).total_seconds())
+            if age < 0:
+                return naturaltime(value)
+            unit = 1 if age < 60 else 60 if age < 3600 else 3600
+            bucket = age - age % unit
+            if bucket not in memo:
+                memo[bucket] = naturaltime(timezone.now() - timedelta(seconds=bucket))
+            return memo[bucket]
+        return natural
+
+    def _image_converter(self):
+        request = self.context.get('request')
+        image_field = Profile._meta.get_field('image')
+        variant = request.GET.get('image_size') if request is not None else None
+
+        def image(name):
+            if not name:
+                return None
+            field_file = image_field.attr_class(None, image_field, name)
+            url = variant_url(field_file, variant) if variant else field_file.url
+            return request.build_absolute_uri(url) if request is not None else url
+        return image
+
+    @property
+    def data(self):
+        time_converter = self._time_converter()
+        image_converter = self._image_converter()
+        converters = self.converters()
+        output = []
+        for row in self.instance:
+            item = {}
+            for name, column, converter in converters:
+                value = row[column]
+                item[name] = time_converter(value) if converter == 'time' and value is not None else value
+            item['poster'] = {
+                'id': row['poster_id'],
+                'first_name': row['poster__user__first_name'],
+                'image': image_converter(row['poster__image']),
+            }
+            output.append(item)
+        return output
+
+
 class PostSerializerForGetForMap(serializers.ModelSerializer):
     """
     Serializer for retrieving posts for map display. To reduce the data size on map.
@@ -45,6 +194,31 @@ class PostSerializerForGetForMap(serializers.ModelSerializer):
         fields = ('id', 'latitude', 'longitude', 'price')
 
 
+class MapClusterSerializer(serializers.Serializer):
+    """
+    Serializer for clustered map cells. Each cell aggregates all the posts inside one geohash tile,
+    so at low zoom the map gets one entry per tile instead of one pin per post.
+    """
+    cell = serializers.CharField()
+    count = serializers.IntegerField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    price_min = serializers.IntegerField()
+    price_max = serializers.IntegerField()
+
+
+class PostViewerStateSerializer(serializers.Serializer):
+    """
+    Serializer for the like count of a post and whether the viewer liked, hid or showed interest in it.
+    This is to draw the hearts and badges of a whole feed page with one call.
+    """
+    id = serializers.IntegerField()
+    like_count = serializers.IntegerField()
+    liked = serializers.BooleanField()
+    hidden = serializers.BooleanField()
+    interested = serializers.BooleanField()
+
+
 class PostSerializerForEachUser(serializers.ModelSerializer):
     """
     Serializer for retrieving posts for each user. This is to show on profile and anywhere we need post_type to be shown.
@@ -64,26 +238,74 @@ class PostSerializerForPosting(serializers.ModelSerializer):
                   'flat_no', 'street_no', 'street', 'neighborhood', 'city', 'country', 'postal_code', 'condition', 'age', 'age_unit')
 
 
+class PostSerializerForBatchPosting(PostSerializerForPosting):
+    """
+    Serializer for posting many posts at once. poster is the poster's account id, as in PostSellForPostingView,
+    and is only checked to be an id here: the posters of a batch are resolved together with resolve_posters
+    instead of one query per post.
+    """
+    poster = serializers.IntegerField(min_value=1)
+
+
 class PostPicturesSerializerForViewing(serializers.ModelSerializer):
     """
     Serializer for viewing post pictures. 
     This is to have each post and its picture in an API call. Used when user click on the post to see more detail.
     """
+    image = VariantImageField()
+
     class Meta:
         model = PostSellPictures
         fields = ('post', 'image')
 
 
+class PostPicturesSerializerForPosting(serializers.ModelSerializer):
+    """
+    Serializer for validating the pictures sent together with a new post, before the post exists.
+    image is an upload or the name of an already stored image.
+    """
+    image = StoredOrUploadedImageField(max_length=PostSellPictures._meta.get_field('image').max_length)
+
+    class Meta:
+        model = PostSellPictures
+        fields = ('image',)
+
+
+class PostDetailSerializer(PostSerializerForGet):
+    """
+    Serializer for the full detail of a post: the post with its poster card, its pictures and the viewer's flags.
+    This is to open (or prefetch) listings with one call instead of one call per piece.
+    """
+    pictures = PostPicturesSerializerForViewing(source='postsellpictures_set', many=True, read_only=True)
+    liked = serializers.BooleanField(read_only=True)
+    hidden = serializers.BooleanField(read_only=True)
+    interested = serializers.BooleanField(read_only=True)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load poster cards with the posts and all their pictures in one more query.
+        """
+        return queryset.select_related('poster__user').prefetch_related(
+            Prefetch('postsellpictures_set', queryset=PostSellPictures.objects.order_by('id'))
+        )
+
+    class Meta(PostSerializerForGet.Meta):
+        pass
+
+
 class PostLikesSerializer(serializers.ModelSerializer):
     """
     Serializer for post likes. This is used to retrieve all the posts that were liked by a user.
     """
-    post_detail = serializers.SerializerMethodField()
-    
-    def get_post_detail(self, obj):
-        post = obj.post
-        serializer = PostSerializerForGet(post, context=self.context)
-        return serializer.data
+    post_detail = PostSerializerForGet(source='post', read_only=True)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load each post and its poster card in the same query as the list.
+        """
+        return queryset.select_related('post__poster__user')
     
     class Meta:
         model = PostSellLikes
@@ -105,12 +327,14 @@ class PostDeletesSerializer(serializers.ModelSerializer):
     Serializer for post deletions. 
     This is used to call for all the posts that users removed from their feed.
     """
-    post_detail = serializers.SerializerMethodField()
-    
-    def get_post_detail(self, obj):
-        post = obj.post
-        serializer = PostSerializerForGet(post, context=self.context)
-        return serializer.data
+    post_detail = PostSerializerForGet(source='post', read_only=True)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load each post and its poster card in the same query as the list.
+        """
+        return queryset.select_related('post__poster__user')
     
     class Meta:
         model = PostSellDeletes
@@ -136,9 +360,18 @@ class ReceivedInterestSerializer(serializers.ModelSerializer):
     item_pictures = serializers.SerializerMethodField()
     item = PostSerializerForGet()
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load buyers, items, posters and item pictures in a fixed number of queries for the whole list.
+        """
+        return queryset.select_related('buyer__user', 'item__poster__user').prefetch_related(
+            Prefetch('item__postsellpictures_set', queryset=PostSellPictures.objects.order_by('id'))
+        )
+
     def get_item_pictures(self, instance):
-        item = instance.item
-        pictures = PostSellPictures.objects.filter(post=item)
+        # Uses the prefetched pictures when the queryset went through setup_eager_loading
+        pictures = instance.item.postsellpictures_set.all()
         serializer = PostPicturesSerializerForViewing(pictures, many=True, context=self.context)
         return serializer.data
     
@@ -150,3 +383,59 @@ class ReceivedInterestSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostSellReceivedInterest
         fields = ('id', 'buyer', 'item', 'time', 'item_pictures')
+
+
+class ReceivedInterestSerializerForCreate(serializers.ModelSerializer):
+    """
+    Serializer for creating received interests.
+    This is used to allow a buyer (profile id) to show interest in an item (post id).
+    """
+    class Meta:
+        model = PostSellReceivedInterest
+        fields = ('buyer', 'item')
+
+
+class InterestedBuyerSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one buyer who showed interest in a post, with when they did.
+    """
+    buyer = ProfileSerializerForShowPost(read_only=True)
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        representation['time'] = naturaltime(instance.time)
+        return representation
+
+    class Meta:
+        model = PostSellReceivedInterest
+        fields = ('buyer', 'time')
+
+
+class SellerInboxSerializer(PostSerializerForGet):
+    """
+    Serializer for the seller's interest inbox: each post once, with its pictures, how many buyers
+    are interested, when the latest one was and the latest few buyers.
+    """
+    LATEST_BUYERS = 3
+
+    item_pictures = PostPicturesSerializerForViewing(source='postsellpictures_set', many=True, read_only=True)
+    interest_count = serializers.IntegerField(read_only=True)
+    latest_interest = serializers.SerializerMethodField()
+    latest_buyers = InterestedBuyerSerializer(source='latest_interests', many=True, read_only=True)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Load poster cards with the posts, then all pictures and the latest buyers of the page in one query each.
+        """
+        latest = PostSellReceivedInterest.objects.select_related('buyer__user').order_by('-time', '-id')
+        return queryset.select_related('poster__user').prefetch_related(
+            Prefetch('postsellpictures_set', queryset=PostSellPictures.objects.order_by('id')),
+            Prefetch('postsellreceivedinterest_set', queryset=latest[:cls.LATEST_BUYERS], to_attr='latest_interests'),
+        )
+
+    def get_latest_interest(self, instance):
+        return naturaltime(instance.latest_interest)
+
+    class Meta(PostSerializerForGet.Meta):
+        pass
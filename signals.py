@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import PostSell, PostSellDeletes, PostSellLikes, PostSellPictures, PostSellReceivedInterest
+from .hidden_posts import invalidate_hidden_posts
+from .tasks import schedule_search_sync, schedule_picture_variants, schedule_interest_notifications
+from .response_cache import bump_generation
+from .stamps import touch, PROFILE_POSTS, POST_PICTURES
+from .recommendations import get_recommendation_index
+from .hot_set import get_hot_set
+
+# Model signal handlers keeping derived data in sync with writes.
+# Connected from apps.PostConfig.ready().
+
+
+@receiver(post_save, sender=PostSell)
+def index_post_on_save(sender, instance, **kwargs):
+    """
+    Queue the search index update, add a created or edited post to the recommendation index (and
+    the hot set) and invalidate cached searches and the poster's post list stamp once the transaction commits.
+    """
+    schedule_search_sync([instance.pk])
+    transaction.on_commit(lambda: get_recommendation_index().add_posts([instance]))
+    hot_set = get_hot_set(refresh=False)
+    if hot_set:
+        transaction.on_commit(lambda: hot_set.update_post(instance))
+    transaction.on_commit(bump_generation)
+    transaction.on_commit(lambda: touch(PROFILE_POSTS, instance.poster_id))
+
+
+@receiver(post_delete, sender=PostSell)
+def remove_post_from_index(sender, instance, **kwargs):
+    """
+    Queue the search index update, drop a deleted post from the recommendation index (and the hot set)
+    and invalidate cached searches and the poster's post list stamp.
+    """
+    post_id, poster_id = instance.pk, instance.poster_id
+    schedule_search_sync([post_id])
+    transaction.on_commit(lambda: get_recommendation_index().remove_post(post_id))
+    hot_set = get_hot_set(refresh=False)
+    if hot_set:
+        transaction.on_commit(lambda: hot_set.remove_post(post_id))
+    transaction.on_commit(bump_generation)
+    transaction.on_commit(lambda: touch(PROFILE_POSTS, poster_id))
+
+
+@receiver(post_save, sender=PostSellDeletes)
+def cache_hidden_post(sender, instance, created, **kwargs):
+    """
+    Invalidate the user's cached hidden set when a post is hidden (DeletePostView and any other writer).
+    """
+    if created:
+        transaction.on_commit(lambda: invalidate_hidden_posts(instance.user_id))
+
+
+@receiver(post_delete, sender=PostSellDeletes)
+def uncache_hidden_post(sender, instance, **kwargs):
+    """
+    Invalidate the user's cached hidden set when a post is un-hidden.
+    """
+    transaction.on_commit(lambda: invalidate_hidden_posts(instance.user_id))
+
+
+@receiver(post_save, sender=PostSellLikes)
+def increment_like_count(sender, instance, created, **kwargs):
+    """
+    Count a new like in the same transaction as the like itself (LikePostView), and invalidate
+    cached searches, whose posts carry like_count.
+    """
+    if created:
+        PostSell.objects.filter(pk=instance.post_id).update(like_count=F('like_count') + 1)
+        transaction.on_commit(bump_generation)
+
+
+@receiver(post_delete, sender=PostSellLikes)
+def decrement_like_count(sender, instance, **kwargs):
+    """
+    Uncount a removed like (LikePostDeleteView) and invalidate cached searches.
+    """
+    PostSell.objects.filter(pk=instance.post_id, like_count__gt=0).update(like_count=F('like_count') - 1)
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=PostSellPictures)
+def create_picture_variants(sender, instance, created, **kwargs):
+    """
+    Invalidate the picture list stamp of the post and queue the thumbnail/card/full variants of a new picture.
+    """
+    transaction.on_commit(lambda: touch(POST_PICTURES, instance.post_id))
+    if created:
+        schedule_picture_variants([instance])
+
+
+@receiver(post_delete, sender=PostSellPictures)
+def touch_pictures_on_delete(sender, instance, **kwargs):
+    """
+    Invalidate the picture list stamp of the post.
+    """
+    post_id = instance.post_id
+    transaction.on_commit(lambda: touch(POST_PICTURES, post_id))
+
+
+@receiver(post_save, sender=PostSellReceivedInterest)
+def notify_seller_of_interest(sender, instance, created, **kwargs):
+    """
+    Queue a notification to the seller about a new interest (ReceivedInterestCreateView and any other writer).
+    """
+    if created:
+        schedule_interest_notifications([(instance.buyer_id, instance.item_id)])
@@ -0,0 +1,61 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.core.cache import cache
+
+# Last-modified stamps for conditional GETs.
+# Writes touch a stamp per profile (its posts) or per post (its pictures); the views turn the stamp
+# into an ETag and Last-Modified and answer If-None-Match / If-Modified-Since with a 304 without
+# running their query. A stamp missing from the cache is recreated as "now", which only costs
+# clients one full response.
+
+PROFILE_POSTS = 'profile_posts'
+POST_PICTURES = 'post_pictures'
+
+
+def _cache_key(kind, pk):
+    return 'post_sell:stamp:%s:%s' % (kind, pk)
+
+
+def touch(kind, pk):
+    """
+    Record that the data behind (kind, pk) changed now.
+    """
+    cache.set(_cache_key(kind, pk), time.time(), None)
+
+
+def get_stamp(kind, pk):
+    """
+    Time of the last change of (kind, pk), as a POSIX timestamp.
+    """
+    stamp = cache.get(_cache_key(kind, pk))
+    if stamp is None:
+        cache.add(_cache_key(kind, pk), time.time(), None)
+        stamp = cache.get(_cache_key(kind, pk)) or time.time()
+    return stamp
+
+
+def conditional_funcs(kind, param):
+    """
+    Return (etag_func, last_modified_func) for django.views.decorators.http.condition, for a view
+    whose data is identified by the query param named param. The ETag also covers the rest of the
+    query string (pagination, image size) and the host, since they change the body.
+    """
+    def _pk(request):
+        value = request.GET.get(param)
+        return value if value and value.isdigit() else None
+
+    def etag_func(request, *args, **kwargs):
+        pk = _pk(request)
+        if pk is None:
+            return None
+        raw = '%s|%r|%s|%s' % (kind, get_stamp(kind, pk), request.get_host(), request.get_full_path())
+        return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        pk = _pk(request)
+        if pk is None:
+            return None
+        return datetime.fromtimestamp(get_stamp(kind, pk), tz=dt_timezone.utc)
+
+    return etag_func, last_modified_func
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+# Opt-in streaming of large JSON lists (?stream=1).
+# The queryset is read with .iterator() in chunks and each chunk is serialized and written
+# before the next one is fetched, so memory stays flat and the first bytes leave early.
+
+STREAM_CHUNK_SIZE = getattr(settings, 'POST_SELL_STREAM_CHUNK_SIZE', 500)
+
+
+def wants_streaming(params):
+    """
+    Streaming is opt-in; clients that need the usual Response keep getting it.
+    """
+    return params.get('stream') in ('1', 'true')
+
+
+def _stream_json_list(queryset, serialize_chunk, chunk_size):
+    encoder = JSONEncoder(ensure_ascii=False)
+    separator = ''
+    yield '['
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            for item in serialize_chunk(chunk):
+                yield separator + encoder.encode(item)
+                separator = ','
+            chunk = []
+    for item in serialize_chunk(chunk):
+        yield separator + encoder.encode(item)
+        separator = ','
+    yield ']'
+
+
+def streaming_response(queryset, serializer_class, request, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream the queryset as a JSON list serialized with serializer_class. Serializers with a prepare()
+    hook (fast list serializers) get their .values() rows.
+    """
+    prepare = getattr(serializer_class, 'prepare', None)
+    if prepare:
+        queryset = prepare(queryset)
+    context = {'request': request}
+
+    def serialize_chunk(rows):
+        if not rows:
+            return []
+        return serializer_class(rows, many=True, context=context).data
+
+    return StreamingHttpResponse(
+        _stream_json_list(queryset, serialize_chunk, chunk_size),
+        content_type='application/json',
+    )
@@ -0,0 +1,272 @@
+import logging
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, IntegrityError, connections
+from django.db.models import Q
+from django.utils import timezone
+
+# Background jobs kept in the database (BackgroundJob) and run by the run_task_worker command.
+# A job is inserted in the same transaction as the write that needs it, so it exists exactly
+# when that write is committed. Jobs with the same dedupe_key collapse into one while they are
+# pending; jobs of a batch task are handed over together, one call per claimed group. When a batch
+# call fails its jobs are run again one by one, so only the jobs that fail on their own are retried
+# with exponential backoff, and kept as failed after max_attempts.
+# With POST_SELL_TASKS_SYNC = True (e.g. in tests) jobs run in-process right after the commit
+# instead, and their errors propagate.
+
+logger = logging.getLogger(__name__)
+
+SYNC = getattr(settings, 'POST_SELL_TASKS_SYNC', False)
+LEASE_SECONDS = 300  # A running job whose worker died is run again after this
+RETRY_DELAY = 10  # Seconds before the first retry; doubled on every attempt
+CLAIM_SIZE = 100  # Jobs a worker claims at once
+
+_registry = {}
+
+
+class Task:
+    """
+    A registered task. Plain tasks get one payload per call, batch tasks a list of payloads.
+    """
+
+    def __init__(self, function, name, batch, max_attempts):
+        self.function = function
+        self.name = name
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+    def run(self, payloads):
+        if self.batch:
+            self.function(payloads)
+        else:
+            for payload in payloads:
+                self.function(payload)
+
+
+def task(name=None, batch=False, max_attempts=3):
+    """
+    Register a function as a task, under its name unless name is given.
+    """
+    def register(function):
+        task_name = name or function.__name__
+        _registry[task_name] = Task(function, task_name, batch, max_attempts)
+        return function
+    return register
+
+
+def enqueue(name, payloads, dedupe_keys=None, delay=0):
+    """
+    Queue one job per payload of the task called name, in one insert. dedupe_keys (one per payload)
+    drop jobs whose key is already pending. Call it inside the transaction of the write it follows.
+    """
+    if name not in _registry:
+        raise KeyError('Unknown task %s' % name)
+    if not payloads:
+        return
+    if SYNC:
+        transaction.on_commit(lambda: _registry[name].run(list(payloads)))
+        return
+
+    from .models import BackgroundJob
+    run_after = timezone.now() + timedelta(seconds=delay)
+    keys = dedupe_keys or [''] * len(payloads)
+    jobs = [BackgroundJob(name=name, payload=payload, dedupe_key=key or '', run_after=run_after)
+            for payload, key in zip(payloads, keys)]
+    BackgroundJob.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+def claim_jobs(limit=CLAIM_SIZE):
+    """
+    Mark up to limit due jobs as running under a lease and return them. Jobs whose lease expired
+    (their worker died) are claimed again. Concurrent workers skip each other's rows, and the UPDATE
+    only takes rows that are still claimable, for databases without row locks (SQLite): only the
+    rows this call updated are returned.
+    """
+    from .models import BackgroundJob
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    claimable = (Q(status=BackgroundJob.PENDING, run_after__lte=now)
+                 | Q(status=BackgroundJob.RUNNING, locked_until__lt=now))
+    with transaction.atomic():
+        candidates = list(
+            BackgroundJob.objects.filter(claimable).select_for_update(skip_locked=True)
+            .order_by('id').values_list('id', flat=True)[:limit]
+        )
+        if not candidates:
+            return []
+        BackgroundJob.objects.filter(claimable, id__in=candidates).update(
+            status=BackgroundJob.RUNNING, locked_until=now + timedelta(seconds=LEASE_SECONDS), lease=token,
+        )
+    return list(BackgroundJob.objects.filter(status=BackgroundJob.RUNNING, lease=token).order_by('id'))
+
+
+def _finish_failed(job, registered, error):
+    from .models import BackgroundJob
+    job.attempts += 1
+    if registered is None or job.attempts >= registered.max_attempts:
+        status, run_after = BackgroundJob.FAILED, job.run_after
+        logger.error('Job %s (%s) failed for good after %d attempts:\n%s', job.id, job.name, job.attempts, error)
+    else:
+        status = BackgroundJob.PENDING
+        run_after = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+    # Only while this claim still holds the job; after its lease expired another worker owns it
+    mine = BackgroundJob.objects.filter(id=job.id, lease=job.lease)
+    try:
+        with transaction.atomic():
+            mine.update(attempts=job.attempts, last_error=error, status=status, run_after=run_after,
+                        locked_until=None, lease='')
+    except IntegrityError:
+        # A newer job with the same dedupe_key is already pending and will do the work
+        mine.delete()
+
+
+def _delete_done(jobs):
+    from .models import BackgroundJob
+    if not jobs:
+        return
+    done = Q()
+    for job in jobs:
+        done |= Q(id=job.id, lease=job.lease)
+    BackgroundJob.objects.filter(done).delete()
+
+
+def run_jobs(jobs):
+    """
+    Run claimed jobs, one call per task for batch tasks, and delete the ones that succeeded.
+    When a batch call fails, its jobs are run again one at a time so that a bad payload
+    only fails its own job.
+    """
+    groups = defaultdict(list)
+    for job in jobs:
+        groups[job.name].append(job)
+    for name, group in groups.items():
+        registered = _registry.get(name)
+        if registered is None:
+            for job in group:
+                _finish_failed(job, None, 'Unknown task %s' % name)
+            continue
+        started = time.perf_counter()
+        try:
+            registered.run([job.payload for job in group])
+        except Exception:
+            if len(group) == 1:
+                _finish_failed(group[0], registered, traceback.format_exc())
+                continue
+            logger.warning('Batch of %d %s jobs failed, running them one by one', len(group), name)
+            done = []
+            for job in group:
+                try:
+                    registered.run([job.payload])
+                except Exception:
+                    _finish_failed(job, registered, traceback.format_exc())
+                else:
+                    done.append(job)
+            _delete_done(done)
+            continue
+        _delete_done(group)
+        logger.info('Ran %d %s jobs in %.3fs', len(group), name, time.perf_counter() - started)
+
+
+def work(once=False, idle_sleep=1.0, claim_size=CLAIM_SIZE):
+    """
+    Claim and run jobs until stopped (or until the queue is empty with once=True).
+    """
+    while True:
+        jobs = claim_jobs(claim_size)
+        if jobs:
+            run_jobs(jobs)
+            continue
+        if once:
+            return
+        connections.close_all()  # Do not hold connections while idle
+        time.sleep(idle_sleep)
+
+
+# Built-in tasks
+
+
+@task(batch=True)
+def sync_search_index(payloads):
+    """
+    Bring the search index in line with the database for the posts in the payloads ({'post_id'}):
+    existing posts are (re)indexed, deleted ones removed. Cached searches are invalidated again
+    since they may have been computed before the index caught up.
+    """
+    from .models import PostSell
+    from .search_index import get_search_backend, FIELD_WEIGHTS
+    from .response_cache import bump_generation
+    backend = get_search_backend()
+    post_ids = {payload['post_id'] for payload in payloads}
+    found = set()
+    for post in PostSell.objects.filter(id__in=post_ids).only('id', *FIELD_WEIGHTS):
+        backend.index_post(post)
+        found.add(post.pk)
+    for post_id in post_ids - found:
+        backend.remove_post(post_id)
+    bump_generation()
+
+
+@task(batch=True)
+def build_picture_variants(payloads):
+    """
+    Generate the image variants of the pictures in the payloads ({'picture_id'}).
+    """
+    from .models import PostSellPictures
+    from .images import build_picture_variants as build
+    picture_ids = {payload['picture_id'] for payload in payloads}
+    for picture in PostSellPictures.objects.filter(id__in=picture_ids, variants_ready=False):
+        build(picture)
+
+
+@task(batch=True)
+def notify_interest(payloads):
+    """
+    Tell sellers about new interest in their posts ({'buyer_id', 'item_id'}), one message per seller.
+    """
+    from .models import PostSellReceivedInterest
+    from .notifications import notify_sellers
+    pairs = {(payload['buyer_id'], payload['item_id']) for payload in payloads}
+    interests = PostSellReceivedInterest.objects.filter(
+        buyer__in={buyer for buyer, _ in pairs}, item__in={item for _, item in pairs},
+    ).select_related('buyer__user', 'item__poster__user')
+    notify_sellers([interest for interest in interests if (interest.buyer_id, interest.item_id) in pairs])
+
+
+def schedule_search_sync(post_ids):
+    """
+    Queue search index updates for posts that were created, edited or deleted. Backends that live
+    in the web process (InMemorySearchBackend) cannot be updated by a worker and are updated now;
+    backends the database keeps up to date (Postgres) need nothing.
+    """
+    from .search_index import get_search_backend, InMemorySearchBackend
+    backend = get_search_backend()
+    if not backend.needs_sync():
+        return
+    post_ids = list(post_ids)
+    if isinstance(backend, InMemorySearchBackend):
+        transaction.on_commit(lambda: sync_search_index([{'post_id': post_id} for post_id in post_ids]))
+        return
+    enqueue('sync_search_index', [{'post_id': post_id} for post_id in post_ids],
+            ['search:%s' % post_id for post_id in post_ids])
+
+
+def schedule_picture_variants(pictures):
+    """
+    Queue variant generation for newly saved pictures.
+    """
+    picture_ids = [picture.pk for picture in pictures if picture.pk]
+    enqueue('build_picture_variants', [{'picture_id': picture_id} for picture_id in picture_ids],
+            ['variants:%s' % picture_id for picture_id in picture_ids])
+
+
+def schedule_interest_notifications(pairs):
+    """
+    Queue seller notifications for new (buyer profile id, post id) interests.
+    """
+    pairs = list(pairs)
+    enqueue('notify_interest', [{'buyer_id': buyer, 'item_id': item} for buyer, item in pairs],
+            ['interest:%s:%s' % pair for pair in pairs])
@@ -7,16 +7,144 @@ from rest_framework import permissions
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import api_view
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.db import transaction
+from django.db.models import Count, Avg, Min, Max, Exists, OuterRef, Value, BooleanField
+from django.db.models.functions import Substr
 from .models import PostSell, PostSellPictures, PostSellLikes, PostSellDeletes, PostSellReceivedInterest
 from .serializers import (
-    PostSerializerForGet, PostSerializerForPosting, PostPicturesSerilizerforViewing,
+    PostSerializerForGet, PostSerializerForPosting, PostPicturesSerializerForViewing,
     PostSerializerForGetForMap, PostSerializerForEachUser, PostLikesSerializer,
-    PostLikesSerializerForCreate, RecievedInterestSerializer, PostDeletesSerializer,
-    PostDeletesSerializerForCreate
+    PostLikesSerializerForCreate, ReceivedInterestSerializer, ReceivedInterestSerializerForCreate, PostDeletesSerializer,
+    PostDeletesSerializerForCreate, MapClusterSerializer, PostViewerStateSerializer,
+    PostPicturesSerializerForPosting, PostSerializerForBatchPosting, PostListFastSerializer, PostDetailSerializer, SellerInboxSerializer
 )
-from account.models import Profile
+from account.models import Profile, Account
 from account.serializers import AccountSerializer
+from .pagination import (
+    wants_pagination, paginated_response, ranked_paginated_response, order_by_rank, get_page_size,
+    encode_cursor, decode_cursor
+)
+from .search_index import get_search_backend
+from .hidden_posts import get_hidden_post_ids, is_hidden
+from .response_cache import cached_response
+from .streaming import wants_streaming, streaming_response
+from .metrics import registry as metrics_registry
+from .stamps import conditional_funcs, PROFILE_POSTS, POST_PICTURES
+from .actions import apply_actions, MAX_ACTIONS
+from .posting import create_post_pictures, create_posts, resolve_posters
+from .facets import wants_facets, facet_counts
+from .hot_set import get_hot_set, MAX_HYDRATE_IDS
+from .recommendations import get_recommendation_index, DEFAULT_NEIGHBOURS, MAX_NEIGHBOURS
+from .geo import parse_coordinate, bbox_around, viewport_q, haversine_km, precision_for_zoom
+
+
+MAX_BATCH_IDS = 100  # Upper bound on ids accepted by the batched endpoints
+UNBOUNDED_CLUSTER_PRECISION = 3  # Finest geohash precision (cells of ~156 km) when clustering without a viewport
+UNBOUNDED_CLUSTER_LIMIT = 1000  # Densest cells returned when clustering without a viewport
+
+
+def parse_id_list(value, limit=MAX_BATCH_IDS):
+    """
+    Parse a comma separated list of ids (e.g. "3,8,21") keeping order and dropping duplicates.
+    Raises ValueError when it is empty, malformed or longer than limit.
+    """
+    try:
+        ids = list(dict.fromkeys(int(item) for item in (value or '').split(',') if item.strip()))
+    except ValueError:
+        raise ValueError('Invalid ids')
+    if not ids:
+        raise ValueError('No ids given')
+    if len(ids) > limit:
+        raise ValueError('At most %d ids per request' % limit)
+    return ids
+
+
+def exclude_hidden_posts(data, hidden_posts):
+    """
+    Drop the posts a user hid from a (cached, shared) list or page of serialized posts.
+    Rows without an id, such as map clusters, are kept.
+    """
+    if not hidden_posts:
+        return data
+    if isinstance(data, dict) and 'results' in data:
+        return dict(data, results=exclude_hidden_posts(data['results'], hidden_posts))
+    if not isinstance(data, list):
+        return data
+    return [row for row in data if row.get('id') is None or not is_hidden(hidden_posts, row['id'])]
+
+
+def hide_posts_for_user(response, request):
+    """
+    Apply the user's hidden posts to a shared search response.
+    """
+    if response.status_code != 200 or not request.user.is_authenticated:
+        return response
+    data = exclude_hidden_posts(response.data, get_hidden_post_ids(request.user.pk))
+    if data == [] and response.data != []:
+        data = "No posts found"
+    response.data = data
+    return response
+
+
+def parse_map_viewport(params):
+    """
+    Read the map viewport from query params. Either a bounding box
+    (south, west, north, east) or a centre and radius (lat, lng, radius in km).
+    Returns (box, circle) where circle is (lat, lng, radius_km) or None,
+    (None, None) when no viewport was sent, and raises ValueError when it is invalid.
+    """
+    if params.get('radius') is not None:
+        lat = parse_coordinate(params.get('lat'), 90)
+        lng = parse_coordinate(params.get('lng'), 180)
+        radius = parse_coordinate(params.get('radius'), 20038)  # Half the earth's circumference in km
+        if lat is None or lng is None or radius is None or radius <= 0:
+            raise ValueError('Invalid map radius')
+        return bbox_around(lat, lng, radius), (lat, lng, radius)
+
+    edges = [params.get(name) for name in ('south', 'west', 'north', 'east')]
+    if all(edge is None for edge in edges):
+        return None, None
+    south, north = parse_coordinate(edges[0], 90), parse_coordinate(edges[2], 90)
+    west, east = parse_coordinate(edges[1], 180), parse_coordinate(edges[3], 180)
+    if None in (south, west, north, east) or south > north:
+        raise ValueError('Invalid map viewport')
+    return (south, west, north, east), None
+
+
+def hot_set_search_ids(query):
+    """
+    Every post id matching the search query, for the hot set to filter on, or None when there are
+    more than MAX_HYDRATE_IDS (the database then filters with the full-text index itself).
+    """
+    ids = get_search_backend().search(query, limit=MAX_HYDRATE_IDS + 1)
+    return ids if len(ids) <= MAX_HYDRATE_IDS else None
+
+
+def hot_set_page_response(hot_set, request, matching_ids):
+    """
+    Serve one feed page from the hot set, reading only the page's rows from the database.
+    Returns None when the hot set cannot answer alone or the params are invalid (the database
+    path then answers, with its usual errors).
+    """
+    try:
+        page_size = get_page_size(request.GET)
+        cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        price_min, price_max = (int(request.GET[name]) if request.GET.get(name) else None
+                                for name in ('price_min', 'price_max'))
+    except ValueError:
+        return None
+    page = hot_set.page(page_size, price_min, price_max, matching_ids, cursor)
+    if page is None:
+        return None
+    page_ids, next_cursor = page
+    posts = order_by_rank(PostListFastSerializer.prepare(PostSell.objects.all()), page_ids)
+    serializer = PostListFastSerializer(posts, many=True, context={'request': request})
+    return Response({'results': serializer.data, 'next': encode_cursor(*next_cursor) if next_cursor else None}, status=200)
+
 
 # API view to search and retrieve post sells for viewing
 class SearchPostSellsForViewing(APIView):
@@ -27,19 +155,34 @@ class SearchPostSellsForViewing(APIView):
     def get(self, request, format=None):
         """
         Retrieve post sells based on search query and filters.
+        Send page_size and/or cursor to get one page as {'results': [...], 'next': cursor}.
+        Send facets=1 to also get condition, city, neighborhood and price counts of all the matches.
+        With q, sort=relevance orders the matches by search rank instead of time.
+        The result is cached for all users; hidden posts are removed afterwards.
+        With stream=1 the whole result is streamed instead (no cache, no pagination).
+        """
+        if wants_streaming(request.GET):
+            return self.stream(request)
+        response = cached_response('feed', request, self.search)
+        return hide_posts_for_user(response, request)
+
+    def filter_queryset(self, request):
+        """
+        Apply the search query and price filters. Returns (queryset, query), query being None without q.
+        The queryset holds every match of q; only sort=relevance is limited to the best ranked ones.
         """
         query = request.GET.get('q')
         price_min = request.GET.get('price_min')
         price_max = request.GET.get('price_max')
 
         # Retrieve all post sells
-        Posts_Sell_queryset = PostSell.objects.all().order_by('-time')
+        Posts_Sell_queryset = PostSerializerForGet.setup_eager_loading(PostSell.objects.all()).order_by('-time')
 
-        # Apply search query filter
+        # Apply search query filter through the full-text index
         if query:
-            Posts_Sell_queryset = Posts_Sell_queryset.filter(
-                Q(title__icontains=query) | Q(description__icontains=query) | Q(size__icontains=query)
-            )
+            Posts_Sell_queryset = get_search_backend().filter(Posts_Sell_queryset, query)
+        else:
+            query = None
 
         # Apply price range filters
         if price_min and price_max:
@@ -50,14 +193,63 @@ class SearchPostSellsForViewing(APIView):
             if price_max:
                 Posts_Sell_queryset = Posts_Sell_queryset.filter(price__lte=price_max)
 
-        # Exclude deleted posts if user is authenticated
+        return Posts_Sell_queryset, query
+
+    def stream(self, request):
+        """
+        Stream every matching post, excluding the user's hidden posts in the query.
+        """
+        Posts_Sell_queryset, query = self.filter_queryset(request)
+        if query and request.GET.get('sort') == 'relevance':
+            Posts_Sell_queryset = order_by_rank(Posts_Sell_queryset, get_search_backend().search(query))
         if request.user.is_authenticated:
-            deleted_posts = PostSellDeletes.objects.filter(user=request.user).values_list('post', flat=True)
-            Posts_Sell_queryset = Posts_Sell_queryset.exclude(id__in=deleted_posts)
+            hidden_posts = get_hidden_post_ids(request.user.pk)
+            if hidden_posts:
+                Posts_Sell_queryset = Posts_Sell_queryset.exclude(id__in=hidden_posts)
+        return streaming_response(Posts_Sell_queryset, PostListFastSerializer, request)
+
+    def search(self, request):
+        """
+        Build the shared (not user specific) search response.
+        With facets=1 the posts come as {'results': ..., 'facets': ...}, the facet counts covering
+        every match of the filters, not only the page.
+        """
+        Posts_Sell_queryset, query = self.filter_queryset(request)
+        response = self.search_results(request, Posts_Sell_queryset, query)
+        if response.status_code != 200 or not wants_facets(request.GET):
+            return response
+        data = response.data if isinstance(response.data, dict) else {'results': response.data}
+        response.data = dict(data, facets=facet_counts(Posts_Sell_queryset))
+        return response
+
+    def search_results(self, request, Posts_Sell_queryset, query):
+        """
+        Serialize the matching posts: one page, or the whole list.
+        """
+        # Order by relevance instead of time when asked to, over the best ranked matches
+        ranked_ids = None
+        if query and request.GET.get('sort') == 'relevance':
+            ranked_ids = get_search_backend().search(query)
+
+        # The feed uses the fast list serializer, same JSON as PostSerializerForGet
+        if wants_pagination(request.GET):
+            if ranked_ids is not None:
+                return ranked_paginated_response(Posts_Sell_queryset, ranked_ids, PostListFastSerializer, request)
+            response = None
+            hot_set = get_hot_set()
+            if hot_set:
+                matching_ids = hot_set_search_ids(query) if query else None
+                if not query or matching_ids is not None:
+                    response = hot_set_page_response(hot_set, request, matching_ids)
+            return response or paginated_response(Posts_Sell_queryset, PostListFastSerializer, request)
+
+        if ranked_ids is not None:
+            Posts_Sell_queryset = order_by_rank(Posts_Sell_queryset, ranked_ids)
+        Posts_Sell_queryset = PostListFastSerializer.prepare(Posts_Sell_queryset)
 
         if Posts_Sell_queryset:
             # Serialize and return the post sells
-            Posts_Sell_obj_serializer = PostSerializerForGet(Posts_Sell_queryset, many=True, context={'request': request})
+            Posts_Sell_obj_serializer = PostListFastSerializer(Posts_Sell_queryset, many=True, context={'request': request})
             return Response(Posts_Sell_obj_serializer.data, status=200)
         else:
             return Response("No posts found", status=200)
@@ -72,19 +264,54 @@ class SearchPostSellsForViewingOnMap(APIView):
     def get(self, request, format=None):
         """
         Retrieve post sells based on search query and filters for map view.
+        The viewport is given either as south/west/north/east or as lat/lng/radius (km).
+        With clustered=1 and a zoom level, aggregated cells are returned instead of pins. Without a viewport
+        the cells are kept coarse and only the densest ones are returned.
+        The result is cached for all users; hidden posts are removed from pins afterwards
+        (cluster counts include them).
+        """
+        response = cached_response('map', request, self.search)
+        return hide_posts_for_user(response, request)
+
+    def search(self, request):
+        """
+        Build the shared (not user specific) map response.
         """
         query = request.GET.get('q')
         price_min = request.GET.get('price_min')
         price_max = request.GET.get('price_max')
 
-        # Retrieve all post sells
+        try:
+            box, circle = parse_map_viewport(request.GET)
+        except ValueError as error:
+            return Response(str(error), status=400)
+
+        # Retrieve all post sells, limited to the viewport when one is given
         Posts_Sell_queryset = PostSell.objects.all().order_by('-time')
+        if box:
+            Posts_Sell_queryset = Posts_Sell_queryset.filter(viewport_q(*box))
 
-        # Apply search query filter
+        # Apply search query filter through the full-text index
         if query:
-            Posts_Sell_queryset = Posts_Sell_queryset.filter(
-                Q(title__icontains=query) | Q(description__icontains=query) | Q(size__icontains=query)
-            )
+            Posts_Sell_queryset = get_search_backend().filter(Posts_Sell_queryset, query)
+
+        # Pins of a viewport can come from the hot set when it holds every post
+        clustered = request.GET.get('clustered') in ('1', 'true')
+        hot_set = get_hot_set(everything=True) if box and not clustered else None
+        matching_ids = None
+        if hot_set and query:
+            matching_ids = hot_set_search_ids(query)
+            if matching_ids is None:
+                hot_set = None
+        if hot_set:
+            try:
+                prices = [int(value) if value else None for value in (price_min, price_max)]
+            except ValueError:
+                prices = None  # Left to the database filters below to reject
+            pin_ids = hot_set.query(*prices, box=box, ids=matching_ids)[0] if prices is not None else None
+            if pin_ids is not None and len(pin_ids) <= MAX_HYDRATE_IDS:
+                Posts_Sell_queryset = PostSell.objects.filter(id__in=pin_ids.tolist()).order_by('-time')
+                price_min = price_max = None
 
         # Apply price range filters
         if price_min and price_max:
@@ -95,10 +322,36 @@ class SearchPostSellsForViewingOnMap(APIView):
             if price_max:
                 Posts_Sell_queryset = Posts_Sell_queryset.filter(price__lte=price_max)
 
-        # Exclude deleted posts if user is authenticated
-        if request.user.is_authenticated:
-            deleted_posts = PostSellDeletes.objects.filter(user=request.user).values_list('post', flat=True)
-            Posts_Sell_queryset = Posts_Sell_queryset.exclude(id__in=deleted_posts)
+        if clustered:
+            try:
+                zoom = int(request.GET.get('zoom', ''))
+            except ValueError:
+                return Response('A zoom level is required for clustering', status=400)
+            # One grouped query per request: the payload grows with the number of tiles, not posts.
+            # Clusters are built from the bounding box; a radius is not trimmed at cell level.
+            precision = precision_for_zoom(zoom)
+            if not box:
+                precision = min(precision, UNBOUNDED_CLUSTER_PRECISION)
+            clusters = (
+                Posts_Sell_queryset.exclude(geohash='')
+                .annotate(cell=Substr('geohash', 1, precision))
+                .values('cell')
+                .annotate(count=Count('id'), latitude=Avg('lat'), longitude=Avg('lng'),
+                          price_min=Min('price'), price_max=Max('price'))
+                .order_by('cell')
+            )
+            if not box:
+                clusters = clusters.order_by('-count', 'cell')[:UNBOUNDED_CLUSTER_LIMIT]
+            cluster_serializer = MapClusterSerializer(clusters, many=True)
+            return Response(cluster_serializer.data, status=200)
+
+        if circle:
+            # The box around the circle was filtered in the database, trim its corners here
+            center_lat, center_lng, radius = circle
+            Posts_Sell_queryset = [
+                post for post in Posts_Sell_queryset
+                if haversine_km(center_lat, center_lng, post.lat, post.lng) <= radius
+            ]
 
         if Posts_Sell_queryset:
             # Serialize and return the post sells
@@ -114,14 +367,21 @@ class AllPostOfOneUser(APIView):
     API view to retrieve all post sells of a user.
     """
 
+    @method_decorator(condition(*conditional_funcs(PROFILE_POSTS, 'id')))
     def get(self, request, format=None):
         """
         Retrieve all post sells of a user.
+        Answers If-None-Match/If-Modified-Since with 304 while the user's posts did not change.
         """
         profile_id = request.GET.get('id')
         profile = get_object_or_404(Profile, id=profile_id)
         posts = PostSell.objects.filter(poster=profile).order_by('-time')
 
+        if wants_streaming(request.GET):
+            return streaming_response(posts, PostSerializerForEachUser, request)
+        if wants_pagination(request.GET):
+            return paginated_response(posts, PostSerializerForEachUser, request)
+
         if posts:
             # Serialize and return the posts
             postsSerilizer = PostSerializerForEachUser(posts, many=True, context={'request': request})
@@ -143,7 +403,7 @@ class PostsSellDetailedView(APIView):
         """
         Retrieve detailed information about a specific post sell.
         """
-        post_obj = PostSell.objects.filter(id=request.data['id']).first()
+        post_obj = PostSerializerForGet.setup_eager_loading(PostSell.objects.filter(id=request.data['id'])).first()
 
         if post_obj:
             # Serialize and return the post sell
@@ -153,21 +413,92 @@ class PostsSellDetailedView(APIView):
         return Response("No post to show", status=403)
 
 
+# API view to retrieve the details of many post sells at once
+class PostsSellBatchDetailView(APIView):
+    """
+    API view to retrieve posts with their pictures, poster card and viewer flags in a fixed number of queries.
+    Uses GET so clients and proxies can cache it.
+    """
+
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
+
+    def get(self, request, format=None):
+        """
+        Retrieve the details of posts, e.g. ?ids=3,8,21&userId=5 (userId is optional, for the viewer flags).
+        Posts come back in the order of ids; ids that do not exist are skipped.
+        """
+        user_id = request.query_params.get('userId')
+        try:
+            post_ids = parse_id_list(request.query_params.get('ids'))
+        except ValueError as error:
+            return Response(str(error), status=400)
+
+        posts = PostDetailSerializer.setup_eager_loading(PostSell.objects.all())
+        if user_id:
+            posts = posts.annotate(
+                liked=Exists(PostSellLikes.objects.filter(post=OuterRef('pk'), user=user_id)),
+                hidden=Exists(PostSellDeletes.objects.filter(post=OuterRef('pk'), user=user_id)),
+                interested=Exists(PostSellReceivedInterest.objects.filter(item=OuterRef('pk'), buyer__user=user_id)),
+            )
+        else:
+            no = Value(False, output_field=BooleanField())
+            posts = posts.annotate(liked=no, hidden=no, interested=no)
+        posts = order_by_rank(posts, post_ids)
+
+        serializer = PostDetailSerializer(posts, many=True, context={'request': request})
+        response = Response(serializer.data, status=200)
+        # Viewer flags make the response personal
+        if user_id:
+            patch_cache_control(response, private=True, max_age=30)
+        else:
+            patch_cache_control(response, public=True, max_age=60)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+# API view to retrieve posts similar to a post
+class SimilarPostsView(APIView):
+    """
+    API view to retrieve the posts most similar to a post (place, price, condition, age and title),
+    for the "similar items nearby" strip under a listing.
+    """
+
+    def get(self, request, format=None):
+        """
+        Retrieve similar posts, closest first, e.g. ?postId=3&userId=5&k=10
+        userId is optional; posts that user hid are left out.
+        """
+        try:
+            post_id = int(request.query_params.get('postId', ''))
+            k = int(request.query_params.get('k', DEFAULT_NEIGHBOURS))
+        except ValueError:
+            return Response("Invalid postId or k", status=400)
+        user_id = request.query_params.get('userId')
+
+        similar_ids = get_recommendation_index().similar(post_id, max(1, min(k, MAX_NEIGHBOURS)), user_id)
+        posts = order_by_rank(PostSerializerForGet.setup_eager_loading(PostSell.objects.all()), similar_ids)
+        serializer = PostSerializerForGet(posts, many=True, context={'request': request})
+        return Response(serializer.data, status=200)
+
+
 # API view to retrieve pictures of a post sell for viewing
 class PostPicturesSerilizerforViewingView(APIView):
     """
     API view to retrieve pictures of a post sell for viewing.
     """
 
+    @method_decorator(condition(*conditional_funcs(POST_PICTURES, 'post_id')))
     def get(self, request, format=None):
         """
         Retrieve pictures of a post sell.
+        Answers If-None-Match/If-Modified-Since with 304 while the pictures did not change.
         """
         post_id = request.query_params.get('post_id')
         post_pictures = PostSellPictures.objects.filter(post_id=post_id)
 
         # Serialize and return the post pictures
-        post_pictures_serializer = PostPicturesSerilizerforViewing(post_pictures, many=True, context={'request': request})
+        post_pictures_serializer = PostPicturesSerializerForViewing(post_pictures, many=True, context={'request': request})
         return Response(post_pictures_serializer.data, status=200)
 
 
@@ -180,7 +511,7 @@ class PostPicturesSerilizerforCreatingView(generics.CreateAPIView):
     permission_classes = (permissions.AllowAny,)
     authentication_classes = (TokenAuthentication,)
     model = PostSellPictures
-    serializer_class = PostPicturesSerilizerforViewing
+    serializer_class = PostPicturesSerializerForViewing
 
 
 # API view to create a post sell
@@ -196,15 +527,58 @@ class PostSellForPostingView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         """
-        Perform creation of a post sell.
+        Perform creation of a post sell and its pictures in one transaction.
         """
+        # Validate the pictures before writing anything
+        pictures = PostPicturesSerializerForPosting(data=self.request.data.get('pictures', []), many=True)
+        pictures.is_valid(raise_exception=True)
+
         poster = Profile.objects.filter(user=self.request.data['poster']).first()
-        post = serializer.save(poster=poster)
-        picture_data = self.request.data.get('pictures', [])
+        with transaction.atomic():
+            post = serializer.save(poster=poster)
+            # Create post sell pictures
+            create_post_pictures([(post, pictures.validated_data)])
+
 
-        # Create post sell pictures
-        for picture in picture_data:
-            PostSellPictures.objects.create(post=post, **picture)
+# API view to create many post sells at once
+class PostSellBatchPostingView(APIView):
+    """
+    API view to create many post sells (with their pictures) in one request, for power sellers and importers.
+    """
+
+    permission_classes = (permissions.AllowAny,)
+    authentication_classes = (TokenAuthentication,)
+    max_batch_size = 200
+
+    def post(self, request, format=None):
+        """
+        Create a list of post sells. Each item has the same fields as PostSellForPostingView, including pictures.
+        Nothing is created unless every post and picture is valid.
+        """
+        items = request.data if isinstance(request.data, list) else request.data.get('posts')
+        if not isinstance(items, list) or not items:
+            return Response('A list of posts is required', status=400)
+        if len(items) > self.max_batch_size:
+            return Response('At most %d posts per request' % self.max_batch_size, status=400)
+
+        posts_serializer = PostSerializerForBatchPosting(data=items, many=True)
+        posts_serializer.is_valid(raise_exception=True)
+        pictures = []
+        for item in items:
+            pictures_serializer = PostPicturesSerializerForPosting(data=item.get('pictures', []), many=True)
+            pictures_serializer.is_valid(raise_exception=True)
+            pictures.append(pictures_serializer.validated_data)
+
+        posters = resolve_posters(post_data['poster'] for post_data in posts_serializer.validated_data)
+        entries = []
+        for post_data, post_pictures in zip(posts_serializer.validated_data, pictures):
+            poster = posters.get(post_data['poster'])
+            if poster is None:
+                return Response('No profile for poster %s' % post_data['poster'], status=400)
+            entries.append((dict(post_data, poster=poster), post_pictures))
+
+        posts = create_posts(entries)
+        return Response({'created': [post.pk for post in posts]}, status=201)
 
 
 # API view to get liked posts per user per post
@@ -220,7 +594,7 @@ class GetLikedPostsPerUserPerPostView(APIView):
         user_id = request.query_params.get('userId')
         post_id = request.query_params.get('postId')
 
-        likes = PostSellLikes.objects.filter(user=user_id, post=post_id)
+        likes = PostLikesSerializer.setup_eager_loading(PostSellLikes.objects.filter(user=user_id, post=post_id))
         liked_posts = [like for like in likes]
         serializer = PostLikesSerializer(liked_posts, many=True, context={'request': request})
         return Response(serializer.data)
@@ -238,9 +612,39 @@ class GetLikedPostsPerUserView(APIView):
         """
         user_id = request.query_params.get('userId')
 
-        likes = PostSellLikes.objects.filter(user=user_id)
-        liked_posts = [like for like in likes]
-        serializer = PostLikesSerializer(liked_posts, many=True, context={'request': request})
+        likes = PostLikesSerializer.setup_eager_loading(PostSellLikes.objects.filter(user=user_id))
+
+        if wants_streaming(request.GET):
+            return streaming_response(likes.order_by('-time', '-id'), PostLikesSerializer, request)
+        if wants_pagination(request.GET):
+            return paginated_response(likes, PostLikesSerializer, request)
+
+        serializer = PostLikesSerializer(likes, many=True, context={'request': request})
+        return Response(serializer.data)
+
+
+# API view to get like counts and the viewer's liked/hidden/interest flags for many posts
+class PostViewerStateView(APIView):
+    """
+    API view to get like counts and viewer flags for a list of posts in one query.
+    """
+
+    def get(self, request):
+        """
+        Get like counts and viewer flags, e.g. ?userId=5&ids=3,8,21
+        """
+        user_id = request.query_params.get('userId')
+        try:
+            post_ids = parse_id_list(request.query_params.get('ids'))
+        except ValueError as error:
+            return Response(str(error), status=400)
+
+        states = PostSell.objects.filter(id__in=post_ids).annotate(
+            liked=Exists(PostSellLikes.objects.filter(post=OuterRef('pk'), user=user_id)),
+            hidden=Exists(PostSellDeletes.objects.filter(post=OuterRef('pk'), user=user_id)),
+            interested=Exists(PostSellReceivedInterest.objects.filter(item=OuterRef('pk'), buyer__user=user_id)),
+        ).values('id', 'like_count', 'liked', 'hidden', 'interested')
+        serializer = PostViewerStateSerializer(states, many=True)
         return Response(serializer.data)
 
 
@@ -280,6 +684,37 @@ class LikePostDeleteView(generics.DestroyAPIView):
             return Response('This post was not liked')
 
 
+# API view to apply queued likes, hides and interests at once
+class PostActionSyncView(APIView):
+    """
+    API view to apply many like/unlike/hide/unhide/interest/uninterest operations of a user in one request,
+    for clients replaying actions queued while offline. Repeating an operation is harmless.
+    """
+
+    permission_classes = (permissions.AllowAny,)
+    authentication_classes = (TokenAuthentication,)
+
+    def post(self, request, format=None):
+        """
+        Apply operations, e.g. {"user": 5, "actions": [{"op": "like", "post": 3}, {"op": "hide", "post": 8}]}.
+        Returns the outcome of every operation in order: applied, unchanged, superseded or invalid.
+        """
+        user_id = request.data.get('user')
+        actions = request.data.get('actions')
+        if not isinstance(actions, list) or not actions:
+            return Response('A list of actions is required', status=400)
+        if len(actions) > MAX_ACTIONS:
+            return Response('At most %d actions per request' % MAX_ACTIONS, status=400)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return Response('A user is required', status=400)
+        if not Account.objects.filter(pk=user_id).exists():
+            return Response('No such user', status=400)
+
+        return Response({'results': apply_actions(user_id, actions)}, status=200)
+
+
 # API view to get deleted posts per user per post
 class GetDeletedPostsPerUserPerPostView(APIView):
     """
@@ -293,7 +728,7 @@ class GetDeletedPostsPerUserPerPostView(APIView):
         user_id = request.query_params.get('userId')
         post_id = request.query_params.get('postId')
 
-        deletes = PostSellDeletes.objects.filter(user=user_id, post=post_id)
+        deletes = PostDeletesSerializer.setup_eager_loading(PostSellDeletes.objects.filter(user=user_id, post=post_id))
         deleted_posts = [deleteitem for deleteitem in deletes]
         serializer = PostDeletesSerializer(deleted_posts, many=True, context={'request': request})
         return Response(serializer.data)
@@ -311,9 +746,14 @@ class GetDeletedPostsPerUserView(APIView):
         """
         user_id = request.query_params.get('userId')
 
-        deletes = PostSellDeletes.objects.filter(user=user_id)
-        deleted_posts = [deleteitem for deleteitem in deletes]
-        serializer = PostDeletesSerializer(deleted_posts, many=True, context={'request': request})
+        deletes = PostDeletesSerializer.setup_eager_loading(PostSellDeletes.objects.filter(user=user_id))
+
+        if wants_streaming(request.GET):
+            return streaming_response(deletes.order_by('-time', '-id'), PostDeletesSerializer, request)
+        if wants_pagination(request.GET):
+            return paginated_response(deletes, PostDeletesSerializer, request)
+
+        serializer = PostDeletesSerializer(deletes, many=True, context={'request': request})
         return Response(serializer.data)
 
 
@@ -341,9 +781,9 @@ class GetReceivedInterestPerUserPerPostView(APIView):
         user_id = request.query_params.get('userId')
         post_id = request.query_params.get('postId')
 
-        interest = PostSellReceivedInterest.objects.filter(user=user_id, post=post_id)
+        interest = ReceivedInterestSerializer.setup_eager_loading(PostSellReceivedInterest.objects.filter(item__poster__user=user_id, item=post_id))
         received_interest = [interest_item for interest_item in interest]
-        serializer = RecievedInterestSerializer(received_interest, many=True, context={'request': request})
+        serializer = ReceivedInterestSerializer(received_interest, many=True, context={'request': request})
         return Response(serializer.data)
 
 
@@ -359,19 +799,44 @@ class GetReceivedInterestPerUserView(APIView):
         """
         user_id = request.query_params.get('userId')
 
-        interest = PostSellReceivedInterest.objects.filter(user=user_id)
+        interest = ReceivedInterestSerializer.setup_eager_loading(PostSellReceivedInterest.objects.filter(item__poster__user=user_id))
+
+        if wants_pagination(request.GET):
+            return paginated_response(interest, ReceivedInterestSerializer, request)
+
         received_interest = [interest_item for interest_item in interest]
-        serializer = RecievedInterestSerializer(received_interest, many=True, context={'request': request})
+        serializer = ReceivedInterestSerializer(received_interest, many=True, context={'request': request})
         return Response(serializer.data)
 
 
+# API view to get the seller's interest inbox
+class SellerInterestInboxView(APIView):
+    """
+    API view to get the posts of a seller that received interest, grouped by post.
+    """
+
+    def get(self, request):
+        """
+        Get one page of the seller's posts with interest, the most recently wanted first, e.g. ?userId=5&page_size=20
+        Each post comes once with its interest count and latest buyers; follow 'next' for the next page.
+        """
+        user_id = request.query_params.get('userId')
+
+        posts = PostSell.objects.filter(poster__user=user_id).annotate(
+            interest_count=Count('postsellreceivedinterest'),
+            latest_interest=Max('postsellreceivedinterest__time'),
+        ).filter(interest_count__gt=0)
+        return paginated_response(SellerInboxSerializer.setup_eager_loading(posts), SellerInboxSerializer, request,
+                                  field='latest_interest')
+
+
 # API view to create received interest
 class ReceivedInterestCreateView(generics.CreateAPIView):
     """
     API view to create received interest.
     """
 
-    serializer_class = RecievedInterestSerializer
+    serializer_class = ReceivedInterestSerializerForCreate
     permission_classes = (permissions.AllowAny,)
     authentication_classes = (TokenAuthentication,)
 
@@ -383,7 +848,7 @@ class ReceivedInterestDeleteView(generics.DestroyAPIView):
     """
 
     queryset = PostSellReceivedInterest.objects.all()
-    serializer_class = RecievedInterestSerializer
+    serializer_class = ReceivedInterestSerializer
     permission_classes = (permissions.AllowAny,)
     authentication_classes = (TokenAuthentication,)
 
@@ -393,7 +858,7 @@ class ReceivedInterestDeleteView(generics.DestroyAPIView):
         """
         post_id = self.kwargs['post_id']
         user_id = self.kwargs['user_id']
-        interest = PostSellReceivedInterest.objects.filter(post_id=post_id, user_id=user_id).first()
+        interest = PostSellReceivedInterest.objects.filter(item=post_id, buyer__user=user_id).first()
         if interest:
             interest.delete()
             return Response('success')
@@ -401,3 +866,18 @@ class ReceivedInterestDeleteView(generics.DestroyAPIView):
             return Response('This interest was not received')
 
 
+# API view to expose per-view request metrics
+class MetricsView(APIView):
+    """
+    API view to expose the per-view request metrics in the Prometheus text format.
+    Meant for the metrics scraper; keep it off the public routes.
+    """
+
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
+
+    def get(self, request, format=None):
+        """
+        Return the metrics recorded by ViewMetricsMiddleware in this process.
+        """
+        return HttpResponse(metrics_registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')